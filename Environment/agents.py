@@ -0,0 +1,56 @@
+import importlib
+from environment_constants import *
+
+# Agent registry: name -> (module, class name, keyword arguments).
+# Modules are only imported when an agent from them is created, so runs
+# that never use a heavy agent (e.g. one that needs NumPy) never load it.
+AGENTS = {
+    'astar': ('snake_astar', 'SnakeAI', {}),
+    'astar-timed': ('snake_astar', 'SnakeAI', {'time_aware': True}),
+    'local': ('snake_local_search', 'SnakeLocalSearch', {}),
+    'local-beam': ('snake_local_search', 'SnakeLocalSearch', {'strategy': 'beam'}),
+    'local-hill': ('snake_local_search', 'SnakeLocalSearch', {'strategy': 'hill_climb'}),
+    'local-anneal': ('snake_local_search', 'SnakeLocalSearch', {'strategy': 'annealing'}),
+    'lut': ('lut_agent', 'LookupAgent', {}),
+    'astar-book': ('snake_astar', 'SnakeAI', {'book': True}),
+    'local-book': ('snake_local_search', 'SnakeLocalSearch', {'book': True}),
+}
+
+
+def register_agent(name, module, class_name, **kwargs):
+    """Add an agent to the registry (kwargs are passed to its constructor)"""
+    AGENTS[name] = (module, class_name, kwargs)
+
+
+def agent_names():
+    """All registered agent names"""
+    return sorted(AGENTS)
+
+
+def resolve_agent(name):
+    """Return (module, class name, kwargs) for a registered name or a 'module:Class' spec"""
+    if name in AGENTS:
+        return AGENTS[name]
+    if ':' in name:
+        module, class_name = name.split(':', 1)
+        return module, class_name, {}
+    raise ValueError(f"Unknown agent {name!r}, expected one of {agent_names()} or 'module:Class'")
+
+
+def agent_class(name):
+    """Import and return the class of an agent"""
+    module, class_name, _ = resolve_agent(name)
+    return getattr(importlib.import_module(module), class_name)
+
+
+def create_agent(name, snake, opponent, grid, food_manager, **overrides):
+    """Create an agent by name, overrides replace the registered keyword arguments"""
+    _, _, kwargs = resolve_agent(name)
+    kwargs = dict(kwargs, **overrides)
+    return agent_class(name)(snake, opponent, grid, food_manager, **kwargs)
+
+
+def agent_pairings(names=None, self_play=False):
+    """Every ordered (agent1, agent2) pairing, so each agent plays both colours"""
+    names = list(names or agent_names())
+    return [(a, b) for a in names for b in names if self_play or a != b]
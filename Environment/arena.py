@@ -0,0 +1,104 @@
+import gc
+import random
+import multiprocessing
+from contextlib import contextmanager, nullcontext
+from environment_constants import *
+from game_logic import Game
+from game_grid import Grid
+
+
+@contextmanager
+def paused_gc():
+    """
+    Keep the cyclic garbage collector out of a match. Collection is off
+    while the match runs (reference counting still frees almost everything)
+    and the match's garbage is collected once afterwards, so long workers
+    pay one small collection between matches instead of random pauses
+    inside timed decisions. Nothing is frozen here, so cycles left by a
+    match are freed like any other garbage.
+    """
+    if not gc.isenabled():
+        yield
+        return
+    gc.disable()
+    try:
+        yield
+    finally:
+        gc.enable()
+        gc.collect()
+
+
+def init_worker():
+    """
+    Start-up of a match worker process: build the shared grid tables, then
+    collect once and freeze what is left (modules, tables), so the
+    collections between matches never scan it again. Called once per
+    process, never per match.
+    """
+    Grid().tables.preload()
+    gc.collect()
+    gc.freeze()
+
+
+def play_match(seed, agent1=DEFAULT_AGENT1, agent2=DEFAULT_AGENT2, values1=None, values2=None,
+               max_turns=MAX_TURNS, agents=None, simultaneous=False, pause_gc=True):
+    """
+    Play one headless game and return a compact result dict:
+    seed, agents, winner (1, 2, ... or 0 for a tie), turns, scores and the
+    mean decision time per move of each agent in ms, and values (the
+    values1/values2 overrides) when there are any.
+    agents lists one agent per snake for games with more than two snakes.
+    pause_gc runs the match under paused_gc().
+    """
+    with paused_gc() if pause_gc else nullcontext():
+        return _run_match(seed, agent1, agent2, values1, values2, max_turns, agents, simultaneous)
+
+
+def _run_match(seed, agent1, agent2, values1, values2, max_turns, agents, simultaneous):
+    """play_match without the GC handling, so the game is gone once it returns"""
+    random.seed(seed)
+    game = Game(headless=True, agent1=agent1, agent2=agent2, agents=agents, simultaneous=simultaneous,
+                diffs=False)
+    if values1:
+        game.ai1.values.update(values1)
+    if values2:
+        game.ai2.values.update(values2)
+
+    while not game.game_over and game.turn_count < max_turns:
+        game.update()
+
+    moves = max(game.turn_count, 1)
+    result = {
+        'seed': seed,
+        'agents': list(game.agent_names),
+        'winner': game.snake_id(game.winner),
+        'turns': game.turn_count,
+        'scores': [snake.score for snake in game.snakes],
+        'decision_ms': [snake.get_total_time() / moves for snake in game.snakes],
+    }
+    if values1 or values2:
+        result['values'] = [values1 or {}, values2 or {}]  # Tuned variants are not the plain agents
+    return result
+
+
+def _play_job(job):
+    """Pool helper: job is a dict of play_match keyword arguments"""
+    return play_match(**job)
+
+
+def play_matches(jobs, workers=None, pool=None):
+    """Play many matches in parallel. jobs are dicts of play_match
+    keyword arguments; results are yielded in the same order.
+    An open multiprocessing pool can be passed to reuse it across batches."""
+    jobs = list(jobs)
+    if pool is not None:
+        yield from pool.imap(_play_job, jobs)
+        return
+    if workers == 1 or len(jobs) <= 1:
+        for job in jobs:
+            yield play_match(**job)
+        return
+
+    with multiprocessing.Pool(workers, initializer=init_worker) as pool:
+        for result in pool.imap(_play_job, jobs):
+            yield result
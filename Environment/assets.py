@@ -0,0 +1,44 @@
+import os
+from functools import lru_cache
+from environment_constants import *
+
+# Images live next to the source files, independent of the working directory
+IMAGE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "images")
+NORMAL_FOOD_IMAGES = "Normal_Food"
+SUPER_FOOD_IMAGES = "Super_Food"
+SPIKE_TRAP_IMAGES = "Traps"
+
+
+@lru_cache(maxsize=None)
+def image_files(folder):
+    """Sorted .png files of an image folder (listed once per process)"""
+    path = os.path.join(IMAGE_DIR, folder)
+    return tuple(os.path.join(path, filename) for filename in sorted(os.listdir(path))
+                 if filename.endswith(".png"))
+
+
+def image_count(folder):
+    """Number of image variants in a folder, without loading pygame"""
+    return len(image_files(folder))
+
+
+@lru_cache(maxsize=None)
+def load_images(folder, size=CELL_SIZE):
+    """Load and scale the images of a folder once per process"""
+    import pygame
+
+    images = []
+    for path in image_files(folder):
+        img = pygame.image.load(path)
+        img = pygame.transform.scale(img, (size, size))
+        images.append(img)
+    return tuple(images)
+
+
+@lru_cache(maxsize=None)
+def load_font(name, size, bold=False):
+    """System font, created once per process"""
+    import pygame
+
+    pygame.font.init()
+    return pygame.font.SysFont(name, size, bold=bold)
@@ -0,0 +1,122 @@
+import time
+import weakref
+from collections import OrderedDict
+
+# Every live cache, so they can be cleared and reported together. Weak
+# references keep finished agents (and their caches) collectable.
+_caches = weakref.WeakSet()
+
+# Counters of caches that were garbage collected, by name
+_retired = {}
+
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    Size-bounded cache with least-recently-used eviction, an optional
+    time-to-live and hit/miss counters. Caches created with per_game=True
+    are emptied by clear_caches() when a new Game starts.
+    """
+
+    def __init__(self, name, maxsize, ttl=None, per_game=True):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl  # seconds, None for no expiry
+        self.per_game = per_game
+        self.entries = OrderedDict()  # key -> (value, time stored)
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        _caches.add(self)
+
+    def get(self, key, default=None):
+        """Return a cached value (and mark it recently used) or default"""
+        entry = self.entries.get(key, _MISSING)
+        if entry is _MISSING:
+            self.misses += 1
+            return default
+
+        value, stored = entry
+        if self.ttl is not None and time.monotonic() - stored > self.ttl:
+            del self.entries[key]
+            self.misses += 1
+            return default
+
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """Store a value, evicting the least recently used entries when full"""
+        self.entries[key] = (value, time.monotonic() if self.ttl is not None else 0)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def get_or_compute(self, key, compute):
+        """Cached value of key, calling compute() on a miss"""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def __del__(self):
+        # Keep the counters of finished agents for cache_stats()
+        totals = _retired.setdefault(self.name, {'hits': 0, 'misses': 0, 'evictions': 0})
+        totals['hits'] += self.hits
+        totals['misses'] += self.misses
+        totals['evictions'] += self.evictions
+
+    def clear(self):
+        """Drop all entries (counters are kept)"""
+        self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self):
+        """Counters of this cache as a dict"""
+        return {
+            'name': self.name,
+            'size': len(self.entries),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hit_rate(),
+        }
+
+
+def clear_caches(per_game_only=True):
+    """Empty the caches, called by Game.__init__ for every new game"""
+    for cache in list(_caches):
+        if cache.per_game or not per_game_only:
+            cache.clear()
+
+
+def cache_stats():
+    """Stats of every cache merged by name, including caches already collected"""
+    merged = {}
+    for name, totals in _retired.items():
+        merged[name] = {'name': name, 'size': 0, 'maxsize': None, **totals}
+    for cache in list(_caches):
+        stats = cache.stats()
+        total = merged.setdefault(stats['name'], dict(stats, size=0, hits=0, misses=0, evictions=0))
+        total['maxsize'] = stats['maxsize']
+        for key in ('size', 'hits', 'misses', 'evictions'):
+            total[key] += stats[key]
+    for total in merged.values():
+        lookups = total['hits'] + total['misses']
+        total['hit_rate'] = total['hits'] / lookups if lookups else 0.0
+    return sorted(merged.values(), key=lambda stats: stats['name'])
@@ -0,0 +1,23 @@
+from environment_constants import *
+
+# Interned direction constants, shared instead of building new lists per call
+DIRECTIONS = (UP, DOWN, LEFT, RIGHT)
+
+# Directions a snake longer than one cell may take, per current direction (no reversing)
+FORWARD_DIRECTIONS = {
+    direction: tuple(d for d in DIRECTIONS if d != (-direction[0], -direction[1]))
+    for direction in DIRECTIONS + ((0, 0),)
+}
+
+
+class Item:
+    """A food item or spike trap on the grid (kind is 'normal', 'super' or 'trap')"""
+    __slots__ = ('kind', 'position', 'variant')
+
+    def __init__(self, kind, position, variant=0):
+        self.kind = kind
+        self.position = position
+        self.variant = variant  # Image variant, only used for drawing
+
+    def __repr__(self):
+        return f"Item({self.kind!r}, {self.position})"
@@ -0,0 +1,173 @@
+from collections import deque
+
+
+class TickDiff:
+    """
+    Changes made by one Game.update: heads added and tail cells removed per
+    snake, items spawned and removed, plus the small per-snake values that
+    change every tick (scores, directions) and eliminations. Snakes are
+    referred to by their index in Game.snakes.
+    """
+    __slots__ = ('turn', 'heads', 'tails', 'spawned', 'removed', 'scores', 'directions', 'eliminated',
+                 'game_over', 'winner')
+
+    def __init__(self, turn, heads=(), tails=(), spawned=(), removed=(), scores=(), directions=(),
+                 eliminated=(), game_over=False, winner=None):
+        self.turn = turn
+        self.heads = list(heads)            # (snake index, new head position), oldest first
+        self.tails = list(tails)            # (snake index, tail cells removed)
+        self.spawned = list(spawned)        # (item kind, position)
+        self.removed = list(removed)        # item positions
+        self.scores = list(scores)
+        self.directions = list(directions)
+        self.eliminated = list(eliminated)  # snake indices
+        self.game_over = game_over
+        self.winner = winner                # Snake id (1, 2, ... or 0 for a tie) once the game is over
+
+    @classmethod
+    def of(cls, game, eliminated=()):
+        """Diff of the tick game just played, read from the change counters of
+        its snakes and the change log of its food manager"""
+        heads = []
+        tails = []
+        for index, snake in enumerate(game.snakes):
+            # Usually one head per tick, more when a controller moved the snake
+            # several times; heads that were popped again never showed
+            shown = min(snake.heads_added, len(snake.body))
+            for position in reversed(snake.body[:shown]):
+                heads.append((index, position))
+            removed = snake.tails_removed - (snake.heads_added - shown)
+            if removed:
+                tails.append((index, removed))
+
+        # Net item changes: an item both spawned and removed this tick never showed
+        spawned = {}
+        removed = []
+        for added, item in game.food_manager.changes:
+            if added:
+                spawned[id(item)] = (item.kind, item.position)
+            elif spawned.pop(id(item), None) is None:
+                removed.append(item.position)
+
+        return cls(game.turn_count, heads, tails, spawned.values(), removed,
+                   [snake.score for snake in game.snakes], [snake.direction for snake in game.snakes],
+                   [game.snakes.index(snake) for snake in eliminated], game.game_over,
+                   game.snake_id(game.winner) if game.game_over else None)
+
+    def to_dict(self):
+        """JSON-ready form"""
+        return {
+            't': 'diff',
+            'turn': self.turn,
+            'heads': [[index, x, y] for index, (x, y) in self.heads],
+            'tails': [list(tail) for tail in self.tails],
+            'spawned': [[kind, x, y] for kind, (x, y) in self.spawned],
+            'removed': [list(position) for position in self.removed],
+            'scores': self.scores,
+            'directions': [list(direction) for direction in self.directions],
+            'eliminated': self.eliminated,
+            'over': self.game_over,
+            'winner': self.winner,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['turn'],
+                   [(index, (x, y)) for index, x, y in data['heads']],
+                   [tuple(tail) for tail in data['tails']],
+                   [(kind, (x, y)) for kind, x, y in data['spawned']],
+                   [tuple(position) for position in data['removed']],
+                   data['scores'],
+                   [tuple(direction) for direction in data['directions']],
+                   data['eliminated'], data['over'], data['winner'])
+
+
+class Snapshot:
+    """
+    Full board state that TickDiffs are applied to: bodies (as deques, so a
+    diff costs O(changes)), directions, scores, alive flags and items.
+    """
+
+    def __init__(self, turn, bodies, directions, scores, alive, items, game_over=False, winner=None):
+        self.turn = turn
+        self.bodies = [deque(body) for body in bodies]
+        self.directions = list(directions)
+        self.scores = list(scores)
+        self.alive = list(alive)
+        self.items = dict(items)    # position -> item kind
+        self.game_over = game_over
+        self.winner = winner
+
+    @classmethod
+    def of(cls, game):
+        return cls(game.turn_count, [snake.body for snake in game.snakes],
+                   [snake.direction for snake in game.snakes], [snake.score for snake in game.snakes],
+                   [snake.alive for snake in game.snakes],
+                   {position: item.kind for position, item in game.food_manager.items_at.items()},
+                   game.game_over, game.snake_id(game.winner) if game.game_over else None)
+
+    def apply(self, diff):
+        """Apply the diff of the next tick. Diffs of any other turn (ones the
+        snapshot already contains, or from another game) are ignored,
+        returns whether the diff was applied."""
+        if diff.turn != self.turn + 1:
+            return False
+        # Heads first: a tail removed in the same tick may be a head of it
+        for index, position in diff.heads:
+            self.bodies[index].appendleft(position)
+        for index, count in diff.tails:
+            body = self.bodies[index]
+            for _ in range(count):
+                body.pop()
+        for position in diff.removed:
+            self.items.pop(position, None)
+        for kind, position in diff.spawned:
+            self.items[position] = kind
+        for index in diff.eliminated:
+            self.alive[index] = False
+        self.turn = diff.turn
+        self.scores = list(diff.scores)
+        self.directions = list(diff.directions)
+        self.game_over = diff.game_over
+        self.winner = diff.winner
+        return True
+
+    def to_dict(self):
+        """JSON-ready form"""
+        return {
+            't': 'snapshot',
+            'turn': self.turn,
+            'snakes': [{'body': [list(p) for p in body], 'direction': list(direction), 'score': score,
+                        'alive': alive}
+                       for body, direction, score, alive in zip(self.bodies, self.directions, self.scores,
+                                                                self.alive)],
+            'items': [[kind, x, y] for (x, y), kind in self.items.items()],
+            'over': self.game_over,
+            'winner': self.winner,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        snakes = data['snakes']
+        return cls(data['turn'], [[tuple(p) for p in snake['body']] for snake in snakes],
+                   [tuple(snake['direction']) for snake in snakes], [snake['score'] for snake in snakes],
+                   [snake['alive'] for snake in snakes], {(x, y): kind for kind, x, y in data['items']},
+                   data['over'], data['winner'])
+
+    def replay_state(self):
+        """The snapshot as a ReplayState, so Game.load_state can draw it"""
+        from replay import ReplayState
+
+        def positions(kind):
+            return [position for position, item_kind in self.items.items() if item_kind == kind]
+
+        return ReplayState(self.turn, self.scores, [list(body) for body in self.bodies], self.directions,
+                           positions('normal'), positions('super'), positions('trap'),
+                           self.winner if self.game_over else None)
+
+
+def apply_diffs(snapshot, diffs):
+    """Apply a sequence of diffs in order and return the snapshot"""
+    for diff in diffs:
+        snapshot.apply(diff)
+    return snapshot
@@ -13,6 +13,12 @@ WHITE = (255, 255, 255)
 GRID_COLOR = (50, 50, 50)
 BLUE = (0, 128, 255)  # Snake 1 color
 ORANGE = (255, 128, 0)   # Snake 2 color
+
+# Colours and names of the snakes in order, repeated for larger games
+SNAKE_COLORS = [BLUE, ORANGE, (60, 200, 90), (170, 80, 220), (230, 60, 80), (240, 220, 60),
+                (60, 220, 220), (255, 120, 200)]
+SNAKE_NAMES = ["Blue Snake", "Orange Snake", "Green Snake", "Purple Snake", "Red Snake",
+               "Yellow Snake", "Cyan Snake", "Pink Snake"]
 DARK_GREY = (175, 175, 175)
 
 
@@ -44,3 +50,70 @@ SPIKE_TRAP_COST = 300  # Penalty for hitting a spike trap
 SAVE_MOVE_COST = 80  # Reward for saving a move
 NORMAL_FOOD_COST = 40
 SUPER_FOOD_COST = 20
+
+# Agent heuristic weights
+DISTANCE_WEIGHT = 5  # Value lost per cell of distance to a food
+OPPONENT_PROXIMITY_PENALTY = 10  # A* penalty per step closer than 3 cells to a visible opponent segment
+TRAP_PROXIMITY_PENALTY = 3  # A* penalty per step closer than 3 cells to a trap
+
+# Agents (names from the registry in agents.py)
+DEFAULT_AGENT1 = 'astar'
+DEFAULT_AGENT2 = 'local'
+
+# Local search settings
+LOCAL_SEARCH_STRATEGY = 'greedy'  # 'greedy', 'beam', 'hill_climb' or 'annealing'
+LOCAL_SEARCH_LOOKAHEAD = 4  # Length of the move sequences searched by the non-greedy strategies
+LOCAL_SEARCH_BEAM_WIDTH = 8  # Sequences kept per lookahead step
+LOCAL_SEARCH_MAX_ITERATIONS = 60  # Sequence changes tried by hill climbing / annealing per move
+LOCAL_SEARCH_DISCOUNT = 0.9  # Weight of each further step
+LOCAL_SEARCH_START_TEMPERATURE = 50  # Simulated annealing start temperature (score units)
+LOCAL_SEARCH_TIME_BUDGET_MS = 2  # Time limit for the sequence search per move
+
+# Cache sizes (entries) of the bounded caches in cache.py
+AGENT_CACHE_SIZE = 8  # Per-agent caches keyed by item version
+SEQUENCE_CACHE_SIZE = 512  # Sequence scores remembered by the local search during one move
+GRID_CACHE_SIZE = 2048  # Shared distance rows / areas per grid size
+
+# Opening book (see opening_book.py)
+OPENING_BOOK_MAX_LENGTH = 3  # Snakes longer than this are past the opening
+OPENING_BOOK_MIN_VOTES = 1  # Teacher decisions needed before a book move is used
+
+# Spectator server (see spectator.py)
+SPECTATOR_PORT = 6382
+SPECTATOR_QUEUE_SIZE = 64  # Diffs queued per subscriber before it is resynced with a snapshot
+SPECTATOR_WRITE_BUFFER = 65536  # Unsent bytes per subscriber before its writes wait
+
+# Steady-state allocation check (see memory_check.py)
+ALLOCATION_WARMUP_GAMES = 5  # Games played first so the bounded caches are full
+ALLOCATION_ENGINE_BUDGET = 1024  # Bytes the engine's part of the median tick may allocate
+ALLOCATION_DECISION_BUDGETS = {  # Bytes the median decision of an agent may allocate (about 1.5x measured)
+    'astar': 2 * 1024,
+    'local': 2 * 1024,
+    'lut': 1024,
+}
+ALLOCATION_BUDGET = 0.5  # Memory blocks a tick may leave behind on average, over whole games
+
+# Telemetry settings
+TELEMETRY_SHARD_SIZE = 65536  # Events buffered in memory before a compressed shard is written
+
+# Event codes stored in the "event" column
+EVENT_MOVE = 0         # value = decision time in ns
+EVENT_NORMAL_FOOD = 1  # value = score gained
+EVENT_SUPER_FOOD = 2   # value = score gained
+EVENT_TRAP = 3         # value = score change (negative)
+EVENT_COLLISION = 4    # value = collision code below
+EVENT_GAME_OVER = 5    # snake = winner id (0 for a tie), value = turn count
+
+ITEM_EVENTS = {
+    'normal': EVENT_NORMAL_FOOD,
+    'super': EVENT_SUPER_FOOD,
+    'trap': EVENT_TRAP,
+}
+
+# Collision codes stored in the "value" column of EVENT_COLLISION
+COLLISION_CODES = {
+    'wall': 0,
+    'self': 1,
+    'body': 2,
+    'head': 3,
+}
@@ -1,7 +1,7 @@
-import pygame
 import random
-import os
 from environment_constants import *
+from cells import Item
+from assets import NORMAL_FOOD_IMAGES, SUPER_FOOD_IMAGES, SPIKE_TRAP_IMAGES, image_count, load_images
 
 
 class FoodManager:
@@ -9,16 +9,24 @@ class FoodManager:
         self.grid = grid
         self.snakes = snakes # list of snakes
 
-        # Store food with image references in table format
+        # Store food and traps as Item records in table format
         self.normal_food_items = []
         self.super_food_items = []
         self.spike_trap_items = []
+        self.items_at = {}  # position -> Item, for O(1) lookups
 
-        # Load normal food images
-        self.normal_food_images = self.load_images("Environment/images/Normal_Food")
-        self.super_food_images = self.load_images("Environment/images/Super_Food")
-        self.spike_trap_images = self.load_images("Environment/images/Traps")
+        # Incremented whenever an item is spawned or removed, so agents can
+        # tell when cached plans are out of date
+        self.version = 0
+        # (added, item) for every spawn and removal since Game.update last
+        # cleared it, read by diffs.TickDiff
+        self.changes = []
+        self.collected = []  # Reused result list of collect_item()
 
+        # Number of image variants; the images themselves are only loaded when drawing
+        self.normal_food_variants = image_count(NORMAL_FOOD_IMAGES)
+        self.super_food_variants = image_count(SUPER_FOOD_IMAGES)
+        self.spike_trap_variants = image_count(SPIKE_TRAP_IMAGES)
 
         # Initialize food and Traps
         for _ in range(FOOD_AMOUNT):
@@ -26,35 +34,57 @@ class FoodManager:
         for _ in range(SPIKE_TRAPS_AMOUNT):
             self.spawn_spike_trap()
 
-
-    def load_images(self, folder_path):
-        """Loads all images from a given folder and scales them."""
-        images = []
-        for filename in os.listdir(folder_path):
-            if filename.endswith(".png"):
-                img = pygame.image.load(os.path.join(folder_path, filename))
-                img = pygame.transform.scale(img, (CELL_SIZE, CELL_SIZE))
-                images.append(img)
-        return images
+    def item_list(self, kind):
+        """The list holding items of a kind"""
+        if kind == 'normal':
+            return self.normal_food_items
+        if kind == 'super':
+            return self.super_food_items
+        return self.spike_trap_items
+
+    def add_item(self, kind, position, variant):
+        """Place a new item"""
+        item = Item(kind, position, variant)
+        self.item_list(kind).append(item)
+        self.items_at[position] = item
+        self.version += 1
+        self.changes.append((True, item))
+        return item
+
+    def remove_item(self, item):
+        """Remove an item from the grid"""
+        self.item_list(item.kind).remove(item)
+        del self.items_at[item.position]
+        self.version += 1
+        self.changes.append((False, item))
+
+    def item_at(self, position):
+        """Item at a position, or None"""
+        return self.items_at.get(position)
+
+    def set_items(self, normal_food, super_food, traps):
+        """Replace all items with the given positions (used by the replay viewer)"""
+        self.normal_food_items = []
+        self.super_food_items = []
+        self.spike_trap_items = []
+        self.items_at = {}
+        for kind, positions, variants in (('normal', normal_food, self.normal_food_variants),
+                                          ('super', super_food, self.super_food_variants),
+                                          ('trap', traps, self.spike_trap_variants)):
+            for pos in positions:
+                # Pick images by position so items do not flicker between turns
+                self.add_item(kind, pos, (pos[0] + pos[1]) % variants)
+        self.changes.clear()  # A full replacement, not a change to diff
 
     def is_position_empty(self, position):
         """Check if a position is empty (no snakes, food, or Traps)"""
-        # Check if position overlaps with any snake
-        for snake in self.snakes:
-            if position in snake.body:
-                return False
-
         # Check if position overlaps with existing food or Traps
-        for food_pos, _ in self.normal_food_items:
-            if position == food_pos:
-                return False
-
-        for food_pos, _ in self.super_food_items:
-            if position == food_pos:
-                return False
+        if position in self.items_at:
+            return False
 
-        for trap_pos, _ in self.spike_trap_items:
-            if position == trap_pos:
+        # Check if position overlaps with any snake still in the game
+        for snake in self.snakes:
+            if snake.alive and position in snake.body:
                 return False
 
         return True
@@ -71,57 +101,61 @@ class FoodManager:
     def spawn_normal_food(self):
         """Spawn normal food at a random location with a random image."""
         position = self.get_random_empty_position()
-        image = random.choice(self.normal_food_images)
-        self.normal_food_items.append((position, image))
+        self.add_item('normal', position, random.randrange(self.normal_food_variants))
 
     def spawn_super_food(self):
         """Spawn super food at a random location with a random image."""
         position = self.get_random_empty_position()
-        image = random.choice(self.super_food_images)
-        self.super_food_items.append((position, image))
+        self.add_item('super', position, random.randrange(self.super_food_variants))
 
     def spawn_spike_trap(self):
         """Spawn a spike trap at a random empty position"""
         position = self.get_random_empty_position()
-        image = random.choice(self.spike_trap_images)
-        self.spike_trap_items.append((position, image))
+        self.add_item('trap', position, random.randrange(self.spike_trap_variants))
 
     def collect_item(self): # -> snake
-        """Check if any snake has collected food or hit a trap"""
+        """Check if any snake has collected food or hit a trap.
+        Returns a list of (snake, item_type, position, score_change) events,
+        reused by the next call."""
+        collected = self.collected
+        collected.clear()
         for snake in self.snakes:
+            if not snake.alive:
+                continue
             head_pos = snake.get_head_position()
-
-            # Check for normal food collection
-            for i, (food_pos, _) in enumerate(self.normal_food_items[:]):
-                if head_pos == food_pos:
-                    self.normal_food_items.pop(i)
-                    snake.grow(EXPANSION_RATE_NORMAL)
-                    snake.score += 1
-                    self.spawn_random_food()
-                    break
-
-            # Check for super food collection
-            for i, (food_pos, _) in enumerate(self.super_food_items[:]):
-                if head_pos == food_pos:
-                    self.super_food_items.pop(i)
-                    snake.grow(EXPANSION_RATE_SUPER)
-
-                    # Random score between 1 and 3
-                    score_increase = random.randint(1, 3)
-                    snake.score += score_increase
-                    self.spawn_random_food()
-                    break
-
-            # Check for spike trap collision
-            for i, (trap_pos, _) in enumerate(self.spike_trap_items[:]):
-                if head_pos == trap_pos:
-                    self.spike_trap_items.pop(i)
-                    isValid = snake.reduce_length()
-                    snake.score = max(0, snake.score-1)
-                    self.spawn_spike_trap()
-                    if not isValid:
-                        snake.score = -1
-                    break
+            item = self.items_at.get(head_pos)
+            if item is None:
+                continue
+
+            self.remove_item(item)
+            if item.kind == 'normal':
+                # Normal food collection
+                snake.grow(EXPANSION_RATE_NORMAL)
+                snake.score += 1
+                collected.append((snake, 'normal', head_pos, 1))
+                self.spawn_random_food()
+
+            elif item.kind == 'super':
+                # Super food collection
+                snake.grow(EXPANSION_RATE_SUPER)
+
+                # Random score between 1 and 3
+                score_increase = random.randint(1, 3)
+                snake.score += score_increase
+                collected.append((snake, 'super', head_pos, score_increase))
+                self.spawn_random_food()
+
+            else:
+                # Spike trap collision
+                isValid = snake.reduce_length()
+                old_score = snake.score
+                snake.score = max(0, snake.score-1)
+                self.spawn_spike_trap()
+                if not isValid:
+                    snake.score = -1
+                collected.append((snake, 'trap', head_pos, snake.score - old_score))
+
+        return collected
 
     def spawn_random_food(self):
         """Spawn either normal food or super food based on probability"""
@@ -132,14 +166,10 @@ class FoodManager:
 
     def draw(self, screen):
         """Draw all food items and Traps"""
-        # Draw normal food
-        for (x, y), image in self.normal_food_items:
-            screen.blit(image, (x * CELL_SIZE, y * CELL_SIZE))
-
-        # Draw super food
-        for (x, y), image in self.super_food_items:
-            screen.blit(image, (x * CELL_SIZE, y * CELL_SIZE))
-
-        # Draw spike Traps
-        for (x, y), image in self.spike_trap_items:
-            screen.blit(image, (x * CELL_SIZE, y * CELL_SIZE))
\ No newline at end of file
+        for items, folder in ((self.normal_food_items, NORMAL_FOOD_IMAGES),
+                              (self.super_food_items, SUPER_FOOD_IMAGES),
+                              (self.spike_trap_items, SPIKE_TRAP_IMAGES)):
+            images = load_images(folder)
+            for item in items:
+                x, y = item.position
+                screen.blit(images[item.variant], (x * CELL_SIZE, y * CELL_SIZE))
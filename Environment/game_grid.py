@@ -1,21 +1,100 @@
-import pygame
 from environment_constants import *
+from cells import DIRECTIONS
+from cache import LRUCache
+
+
+class GridTables:
+    """
+    Lookup tables for one grid size, built once and shared by every Grid
+    (and so every game and agent) with the same dimensions.
+    """
+    _tables = {}
+
+    @classmethod
+    def for_size(cls, width, height):
+        """Shared tables of a grid size"""
+        key = (width, height)
+        if key not in cls._tables:
+            cls._tables[key] = cls(width, height)
+        return cls._tables[key]
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+
+        # Position of every cell id and the reverse mapping (also the on-grid test)
+        self.positions = tuple((x, y) for y in range(height) for x in range(width))
+        self.cell_ids = {position: cell for cell, position in enumerate(self.positions)}
+
+        # position -> ((direction, neighbour position), ...) with off-grid moves removed
+        self.neighbours = {
+            (x, y): tuple((direction, (x + direction[0], y + direction[1])) for direction in DIRECTIONS
+                          if 0 <= x + direction[0] < width and 0 <= y + direction[1] < height)
+            for x, y in self.positions
+        }
+
+        # Built lazily and bounded: target position -> {position: Manhattan distance}
+        self.distance_rows = LRUCache('grid.distance_rows', GRID_CACHE_SIZE, per_game=False)
+        # (position, radius) -> {position: Manhattan distance} for cells within radius
+        self.areas = LRUCache('grid.areas', GRID_CACHE_SIZE, per_game=False)
+
+    def distances_to(self, target):
+        """Manhattan distance from every cell to target"""
+        row = self.distance_rows.get(target)
+        if row is None:
+            tx, ty = target
+            # Keyed by the shared position tuples, so a row is one new dict
+            row = {position: abs(position[0] - tx) + abs(position[1] - ty) for position in self.positions}
+            self.distance_rows.put(target, row)
+        return row
+
+    def preload(self, radius=2):
+        """Build every distance row, and the area of every cell within radius
+        (the A* penalty radius), up front when they fit in the caches, so
+        long runs never grow them mid-game (see memory_check.py)"""
+        if len(self.positions) <= self.distance_rows.maxsize:
+            for position in self.positions:
+                self.distances_to(position)
+        if len(self.positions) <= self.areas.maxsize:
+            for position in self.positions:
+                self.cells_within(position, radius)
+
+    def distance(self, a, b):
+        """Manhattan distance between two on-grid positions"""
+        return self.distances_to(b)[a]
+
+    def cells_within(self, position, radius):
+        """{position: distance} of the on-grid cells within a Manhattan radius"""
+        key = (position, radius)
+        area = self.areas.get(key)
+        if area is None:
+            x, y = position
+            area = {}
+            for dy in range(-radius, radius + 1):
+                for dx in range(-radius + abs(dy), radius - abs(dy) + 1):
+                    cell = self.cell_ids.get((x + dx, y + dy))
+                    if cell is not None:
+                        area[self.positions[cell]] = abs(dx) + abs(dy)
+            self.areas.put(key, area)
+        return area
+
 
 class Grid:
     def __init__(self):
         self.width = GRID_WIDTH
         self.height = GRID_HEIGHT
         self.cell_size = CELL_SIZE
+        self.tables = GridTables.for_size(self.width, self.height)
 
     def is_valid_position(self, position):
         """Check if a position is within the grid boundaries"""
-        x, y = position
-        insideGrid = (x >= 0 and x < (self.width)) and (y >= 0 and y < (self.height))
-        return insideGrid
+        return position in self.tables.cell_ids
 
 
     def draw(self, screen):
         """Draw the grid"""
+        import pygame  # Only needed for drawing, logic-only runs never load it
+
         for x in range(self.width):
             for y in range(self.height):
                 # Draw grid lines
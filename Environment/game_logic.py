@@ -1,45 +1,105 @@
-import pygame
 import random
 from environment_constants import *
 from game_grid import Grid
-from snake import Snake
+from snake import Snake, Rivals
 from food import FoodManager
-from newUI import UI
-from snake_astar import SnakeAI
-from snake_local_search import SnakeLocalSearch
+from agents import create_agent
+from cache import clear_caches
+from diffs import TickDiff
 import time
 
 class Game:
-    def __init__(self):
-        self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-        pygame.display.set_caption("Snake AI Competition - ICS 381 Project")
+    def __init__(self, telemetry=None, replay=None, headless=False,
+                 agent1=DEFAULT_AGENT1, agent2=DEFAULT_AGENT2, agents=None, simultaneous=False, diffs=True):
+        # Start every game with empty per-game caches
+        clear_caches()
+
+        # Headless games (tournaments, tuning) never open a window
+        self.headless = headless
+        self.screen = None
+        if not headless:
+            import pygame  # Only windowed games load pygame
+            self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+            pygame.display.set_caption("Snake AI Competition - ICS 381 Project")
+
+        # One agent name per snake; agents overrides the two-player agent1/agent2
+        agents = list(agents) if agents is not None else [agent1, agent2]
+        if len(agents) < 2:
+            raise ValueError("A game needs at least two snakes")
 
         # Initialize game components
         self.grid = Grid()
 
-        # Create snakes with random positions
-        snake1_pos = self.get_random_position()
-        snake2_pos = self.get_random_position()
-        while snake2_pos == snake1_pos:  # Ensure they don't overlap
-            snake2_pos = self.get_random_position()
+        # Create snakes with random, distinct positions
+        positions = []
+        for _ in agents:
+            position = self.get_random_position()
+            while position in positions:  # Ensure they don't overlap
+                position = self.get_random_position()
+            positions.append(position)
 
-        self.snake1 = Snake(snake1_pos, BLUE, "Blue Snake")
-        self.snake2 = Snake(snake2_pos, ORANGE, "Orange Snake")
+        self.snakes = [Snake(position, SNAKE_COLORS[index % len(SNAKE_COLORS)],
+                             SNAKE_NAMES[index % len(SNAKE_NAMES)])
+                       for index, position in enumerate(positions)]
+        self.snake1, self.snake2 = self.snakes[0], self.snakes[1]
 
         # Initialize food manager
-        self.food_manager = FoodManager(self.grid, [self.snake1, self.snake2])
+        self.food_manager = FoodManager(self.grid, self.snakes)
 
         # Initialize UI
-        self.ui = UI(self.screen)
+        self.ui = None
+        if not headless:
+            from newUI import UI
+            self.ui = UI(self.screen)
 
         # Game state
         self.game_over = False
         self.winner = None
         self.turn_count = 0
 
-        # AI agents (optional - comment out if using human controls)
-        self.ai1 = SnakeAI(self.snake1, self.snake2, self.grid, self.food_manager) 
-        self.ai2 = SnakeLocalSearch(self.snake2, self.snake1, self.grid, self.food_manager)
+        # AI agents by registry name (see agents.py). None leaves the snake to an
+        # outside controller (keyboard, rl_env.SnakeEnv) that moves it before update().
+        # Agents play against one opponent: the other snake, or with more snakes
+        # all the others together (snake.Rivals).
+        self.agent_names = tuple(agents)
+        self.agents = []
+        for index, (name, snake) in enumerate(zip(agents, self.snakes)):
+            opponent = self.snakes[1 - index] if len(self.snakes) == 2 else Rivals(snake, self.snakes)
+            self.agents.append(None if name is None else
+                               create_agent(name, snake, opponent, self.grid, self.food_manager))
+        self.ai1, self.ai2 = self.agents[0], self.agents[1]
+
+        # With simultaneous turns every agent decides on the same board,
+        # otherwise each one sees the moves of the snakes before it
+        self.simultaneous = simultaneous
+
+        # Items resolved by the last update, see FoodManager.collect_item
+        self.last_collected = []
+
+        # Changes made by the last update (diffs.TickDiff), None before the
+        # first one or when diffs is off (matches nobody watches). Counting
+        # starts from the board as it is now.
+        self.diffs = diffs
+        self.last_diff = None
+        self.reset_changes()
+
+        # Buffers reused by every update, so the engine allocates almost nothing per tick
+        self.contenders = []
+        self.occupied = {}
+        self.heads = {}
+        self.eliminated = []
+        self.grid_surface = None
+
+        # Optional telemetry writer (see telemetry.py)
+        self.telemetry = telemetry
+        if self.telemetry is not None:
+            self.telemetry.new_game()
+
+        # Optional replay archive writer (see replay.py)
+        self.replay = replay
+        if self.replay is not None:
+            self.replay.new_game()
+            self.replay.record_turn(self)
 
     def get_random_position(self):
         """Generate a random position on the grid"""
@@ -47,10 +107,13 @@ class Game:
 
     def handle_input(self, event):
         """Handle user input for snake movement"""
+        import pygame
+
         if self.game_over:
             # Check for restart
             if event.type == pygame.KEYDOWN and event.key == pygame.K_SPACE:
-                self.__init__()  # Reset the game
+                self.__init__(self.telemetry, self.replay, self.headless, agents=self.agent_names,
+                              simultaneous=self.simultaneous, diffs=self.diffs)  # Reset the game
             return
 
         # Human controls - only needed if not using AI
@@ -82,123 +145,192 @@ class Game:
 
         # Increment turn counter
         self.turn_count += 1
+        contenders = self.contenders
+        contenders.clear()
+        for snake in self.snakes:
+            if snake.alive:
+                contenders.append(snake)
 
         # Check for max turns
         if self.turn_count >= MAX_TURNS:
             self.game_over = True
-            if self.snake1.score > self.snake2.score:
-                self.winner = self.snake1
-            elif self.snake2.score > self.snake1.score:
-                self.winner = self.snake2
-            else:
-                self.winner = None  # Tie
+            best = max(snake.score for snake in contenders)
+            leaders = [snake for snake in contenders if snake.score == best]
+            self.winner = leaders[0] if len(leaders) == 1 else None  # Tie without a single leader
+            self.record_game_over()
+            self.record_diff(contenders)
+            self.record_replay()
             return
 
-        # Get AI moves
-        
-        # calculate the time takes to make disition 
-        start_time_1 = time.perf_counter_ns() 
-        self.ai1.make_move() 
-        end_time_1 = time.perf_counter_ns()
-        self.snake1.timer(end_time_1 - start_time_1)
-        # print(f"AI 1 decision time: {(end_time_1 - start_time_1)/ 1_000_000} ns")
-        
-        start_time_2 = time.perf_counter_ns() 
-        self.ai2.make_move()
-        end_time_2 = time.perf_counter_ns() 
-        self.snake2.timer(end_time_2 - start_time_2)    
-        # print(f"AI 2 decision time: {(end_time_2 - start_time_2)/ 1_000_000} ns")
-
-
-        # Check for collisions and food
-        self.check_collisions()
-        self.food_manager.collect_item()
-
-        # Check win conditions
-        if self.snake1.score >= MAX_SCORE:
-            self.game_over = True
-            self.winner = self.snake1
-        elif self.snake2.score >= MAX_SCORE:
-            self.game_over = True
-            self.winner = self.snake2
-
-        elif self.snake1.score <0:
-            self.game_over = True
-            self.winner = self.snake2
-
-        elif self.snake2.score < 0:
-            self.game_over = True
-            self.winner = self.snake1
-
+        # Get AI moves, timing every decision
+        if self.simultaneous:
+            for snake in contenders:
+                snake.deferred = True
+
+        for snake, agent in zip(self.snakes, self.agents):
+            if not snake.alive:
+                continue
+            start_time = time.perf_counter_ns()
+            if agent is not None:
+                agent.make_move()
+            elapsed = time.perf_counter_ns() - start_time
+            snake.timer(elapsed)
+            if self.telemetry is not None and not self.simultaneous:
+                self.record(snake, EVENT_MOVE, snake.get_head_position(), elapsed)
+
+        if self.simultaneous:
+            for snake in contenders:
+                snake.apply_deferred_move()
+                # Recorded once the move is made, so the position is the new head
+                if self.telemetry is not None:
+                    self.record(snake, EVENT_MOVE, snake.get_head_position(), snake.last_decision_time)
+
+        # Check for collisions and food. Snakes that collided still resolve the
+        # item under their head, as every snake moved at the same time
+        eliminated = self.check_collisions()
+        collected = self.food_manager.collect_item()
+        self.last_collected = collected
+        for snake in eliminated:
+            snake.alive = False
+
+        if self.telemetry is not None:
+            for snake, item_type, position, score_change in collected:
+                self.record(snake, ITEM_EVENTS[item_type], position, score_change)
+
+        # Check win conditions: reaching MAX_SCORE wins outright, a negative
+        # score eliminates, and the game ends when at most one snake is left
+        for snake in contenders:
+            if snake.score >= MAX_SCORE:
+                self.game_over = True
+                self.winner = snake
+                break
+        else:
+            survivors = 0
+            survivor = None
+            for snake in contenders:
+                if snake.alive and snake.score < 0:
+                    snake.alive = False
+                if snake.alive:
+                    survivors += 1
+                    survivor = snake
+            if survivors <= 1:
+                self.game_over = True
+                self.winner = survivor  # None, a tie, when all went out together
 
+        if self.game_over:
+            self.record_game_over()
+        self.record_diff(contenders)
+        self.record_replay()
+
+    def snake_id(self, snake):
+        """Telemetry id of a snake (1, 2, ... in order, 0 for none)"""
+        for index, other in enumerate(self.snakes):
+            if other is snake:
+                return index + 1
+        return 0
+
+    def record(self, snake, event, position=(0, 0), value=0):
+        """Record a telemetry event for this turn"""
+        if self.telemetry is not None:
+            self.telemetry.record(self.turn_count, self.snake_id(snake), event, position, value)
+
+    def record_diff(self, contenders):
+        """Build last_diff from the changes counted since the last one"""
+        if self.diffs:
+            eliminated = [snake for snake in contenders if not snake.alive]
+            self.last_diff = TickDiff.of(self, eliminated)
+        self.reset_changes()
+
+    def reset_changes(self):
+        """Start counting snake and item changes for the next diff"""
+        for snake in self.snakes:
+            snake.reset_changes()
+        self.food_manager.changes.clear()
+
+    def record_replay(self):
+        """Append this turn to the replay archive"""
+        if self.replay is not None:
+            self.replay.record_turn(self)
+
+    def record_game_over(self):
+        """Record the final result"""
+        self.record(self.winner, EVENT_GAME_OVER, value=self.turn_count)
 
     def check_collisions(self):
-        """Check for collisions between snakes, walls, and themselves"""
-        # Check if snakes hit the wall
-        if not self.grid.is_valid_position(self.snake1.get_head_position()):
-            self.game_over = True
-            self.winner = self.snake2
-            return
-
-        if not self.grid.is_valid_position(self.snake2.get_head_position()):
-            self.game_over = True
-            self.winner = self.snake1
-            return
-
-        # Check if snakes hit themselves
-        if self.snake1.check_self_collision():
-            self.game_over = True
-            self.winner = self.snake2
-            return
-
-        if self.snake2.check_self_collision():
-            self.game_over = True
-            self.winner = self.snake1
-            return
-
-        # Check if snakes hit each other
-        head1 = self.snake1.get_head_position()
-        head2 = self.snake2.get_head_position()
+        """
+        Find every snake that hit a wall, a body (its own or another) or
+        another head this turn, and return them. All snakes are resolved
+        together with one pass over the bodies: body cells map to their
+        owner and head cells to the snakes whose head is there, so the cost
+        is linear in the total body length.
+        """
+        snakes = self.contenders
+        occupied = self.occupied    # body cell (head excluded) -> owner
+        heads = self.heads          # head cell -> number of heads there
+        occupied.clear()
+        heads.clear()
+        for snake in snakes:
+            body = snake.body
+            for index in range(1, len(body)):
+                occupied[body[index]] = snake
+            heads[body[0]] = heads.get(body[0], 0) + 1
+
+        eliminated = self.eliminated
+        eliminated.clear()
+        for snake in snakes:
+            head = snake.body[0]
+            if not self.grid.is_valid_position(head):
+                reason = 'wall'
+            elif head in occupied:
+                reason = 'self' if occupied[head] is snake else 'body'
+            elif heads[head] > 1:
+                reason = 'head'
+            else:
+                continue
+            eliminated.append(snake)
+            self.record(snake, EVENT_COLLISION, head, COLLISION_CODES[reason])
+        return eliminated
+
+    def load_state(self, state):
+        """Show a ReplayState loaded from a replay archive"""
+        for snake, body, direction, score in zip(self.snakes, state.bodies,
+                                                 state.directions, state.scores):
+            snake.body = list(body)
+            snake.direction = direction
+            snake.score = score
+            snake.alive = True
+
+        self.food_manager.set_items(state.normal_food, state.super_food, state.traps)
+        self.turn_count = state.turn
+        self.game_over = state.game_over
+        self.winner = self.snakes[state.winner - 1] if state.winner else None
+        self.reset_changes()  # The loaded board is not a change of the last one
 
-        # Head-to-head collision (tie)
-        if head1 == head2:
-            self.game_over = True
-            self.winner = None
+    def render(self):
+        """Render the game"""
+        if self.headless:
             return
 
-        # Snake 1 hits Snake 2's body
-        for segment in self.snake2.body[1:]:
-            if head1 == segment:
-                self.game_over = True
-                self.winner = self.snake2
-                return
-
-        # Snake 2 hits Snake 1's body
-        for segment in self.snake1.body[1:]:
-            if head2 == segment:
-                self.game_over = True
-                self.winner = self.snake1
-                return
-
+        import pygame
 
-    def render(self):
-        """Render the game"""
         # Clear the screen
         self.screen.fill(BLACK)
 
-        # Create grid surface
-        grid_surface = pygame.Surface((GRID_WIDTH * CELL_SIZE, GRID_HEIGHT * CELL_SIZE))
-        grid_surface.fill(DARK_GREY)  # Changed to dark grey like in the image
+        # Create the grid surface once, it is the same every frame
+        if self.grid_surface is None:
+            self.grid_surface = pygame.Surface((GRID_WIDTH * CELL_SIZE, GRID_HEIGHT * CELL_SIZE))
+            self.grid_surface.fill(DARK_GREY)  # Changed to dark grey like in the image
 
-        # Draw grid with lines
-        self.ui.draw_grid(grid_surface)
+            # Draw grid with lines
+            self.ui.draw_grid(self.grid_surface)
 
         # Draw food and Traps
         self.food_manager.draw(self.screen)
 
-        # Draw the snakes
-        self.snake1.draw(self.screen)
-        self.snake2.draw(self.screen)
+        # Draw the snakes, eliminated ones only on the final board
+        for snake in self.snakes:
+            if snake.alive or self.game_over:
+                snake.draw(self.screen)
 
         # Draw UI elements - passing snake lengths
         self.ui.draw_scores(
@@ -0,0 +1,238 @@
+import os
+import json
+import math
+import hashlib
+import argparse
+from environment_constants import *
+from arena import play_matches
+from agents import agent_names, agent_pairings, resolve_agent
+
+INITIAL_RATING = 1500.0
+INITIAL_DEVIATION = 350.0
+MIN_DEVIATION = 30.0        # Keeps ratings movable when agents change between runs
+SEED_OFFSET = 300_000       # Ladder games use their own seeds, apart from tuning.py and sprt.py
+Q = math.log(10) / 400
+
+
+def g(deviation):
+    """Glicko weight of a result against an opponent of this rating deviation"""
+    return 1.0 / math.sqrt(1.0 + 3.0 * Q * Q * deviation * deviation / (math.pi * math.pi))
+
+
+def expected_score(rating, opponent_rating, opponent_deviation):
+    return 1.0 / (1.0 + 10.0 ** (-g(opponent_deviation) * (rating - opponent_rating) / 400.0))
+
+
+def rating_name(agent, values=None):
+    """Ladder name of an agent played with values overrides (see tuning.py):
+    the plain agent name, or the name and a short hash of the values, so a
+    tuned variant gets a rating of its own"""
+    if not values:
+        return agent
+    digest = hashlib.sha1(json.dumps(values, sort_keys=True).encode()).hexdigest()[:8]
+    return f"{agent}@{digest}"
+
+
+class Ladder:
+    """
+    Persistent rating table of agents, stored as JSON.
+    Ratings follow Glicko: every agent has a rating and a deviation that
+    shrinks as it plays, and each game updates both players from their
+    current values only, so no history is replayed. Agents played with
+    values overrides are rated apart from the plain agent (rating_name).
+    For every ingested results file the ladder keeps how far it was read,
+    so ingesting a file again only counts the games added since.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.ratings = {}
+        self.ingested = {}      # results file path -> bytes already counted
+        self.next_seed = SEED_OFFSET
+        self.load()
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        with open(self.path) as f:
+            state = json.load(f)
+        self.ratings = state['ratings']
+        self.ingested = state['ingested']
+        self.next_seed = state['next_seed']
+
+    def save(self):
+        """Write the table atomically"""
+        if not self.path:
+            return
+        state = {
+            'ratings': self.ratings,
+            'ingested': self.ingested,
+            'next_seed': self.next_seed,
+        }
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f, indent=1)
+        os.replace(tmp_path, self.path)
+
+    def entry(self, name, agent=None, values=None):
+        """Rating of name, created for agent played with values when it is new"""
+        if name not in self.ratings:
+            self.ratings[name] = {'agent': agent or name, 'values': values or {},
+                                  'rating': INITIAL_RATING, 'deviation': INITIAL_DEVIATION,
+                                  'games': 0, 'wins': 0, 'draws': 0, 'losses': 0}
+        return self.ratings[name]
+
+    def record(self, result):
+        """Update both ratings from one arena/tournament result. Returns
+        False when it is not a two-player game (ratings are pairwise, N-snake
+        results are skipped)."""
+        if len(result['agents']) != 2:
+            return False
+
+        values1, values2 = result.get('values') or ({}, {})
+        agent1, agent2 = (rating_name(agent, values) for agent, values in zip(result['agents'], (values1, values2)))
+        if agent1 == agent2:
+            return True  # Self-play says nothing about the rating
+
+        score1 = {1: 1.0, 2: 0.0, 0: 0.5}[result['winner']]
+        first = self.entry(agent1, result['agents'][0], values1)
+        second = self.entry(agent2, result['agents'][1], values2)
+        before = (dict(first), dict(second))
+        for player, opponent, score in ((first, before[1], score1), (second, before[0], 1.0 - score1)):
+            self.update(player, opponent, score)
+            player['games'] += 1
+            if score == 1:
+                player['wins'] += 1
+            elif score == 0:
+                player['losses'] += 1
+            else:
+                player['draws'] += 1
+        return True
+
+    def update(self, player, opponent, score):
+        """Glicko update of player after one game against opponent (pre-game values)"""
+        weight = g(opponent['deviation'])
+        expected = expected_score(player['rating'], opponent['rating'], opponent['deviation'])
+        inverse_d2 = Q * Q * weight * weight * expected * (1 - expected)
+        precision = 1.0 / player['deviation'] ** 2 + inverse_d2
+        player['rating'] += Q / precision * weight * (score - expected)
+        player['deviation'] = max(math.sqrt(1.0 / precision), MIN_DEVIATION)
+
+    def ingest(self, path):
+        """
+        Add the results of a tournament.py results file, returns how many
+        were new. Results files are append-only and hold every job once, so
+        reading starts where the last ingest of the file stopped. A partly
+        written last line is left for the next ingest.
+        """
+        if not os.path.exists(path):
+            return 0
+        key = os.path.abspath(path)
+        offset = self.ingested.get(key, 0)
+        if os.path.getsize(path) < offset:
+            raise ValueError(f"{path} is shorter than when it was last ingested, it is not the same results file")
+        added = 0
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                offset += len(line)
+                try:
+                    result = json.loads(line)
+                except ValueError:
+                    continue  # Cut off when the coordinator was killed mid-write
+                added += self.record(result)
+        self.ingested[key] = offset
+        self.save()
+        return added
+
+    def information(self, agent1, agent2):
+        """
+        Expected reduction of rating variance from one game between two
+        agents: large when their deviations are large and the outcome is
+        close to a coin flip.
+        """
+        first, second = self.entry(agent1), self.entry(agent2)
+        expected = expected_score(first['rating'], second['rating'], second['deviation'])
+        return (first['deviation'] ** 2 + second['deviation'] ** 2) * expected * (1 - expected)
+
+    def schedule(self, agents=None, count=4):
+        """The count most informative unordered pairings among agents"""
+        agents = list(agents or self.ratings or agent_names())
+        pairings = {tuple(sorted(pair)) for pair in agent_pairings(agents)}
+        return sorted(pairings, key=lambda pair: -self.information(*pair))[:count]
+
+    def job_args(self, name, player):
+        """play_match arguments that put the rated name in seat player (1 or 2)"""
+        entry = self.entry(name)
+        args = {f'agent{player}': entry.get('agent', name)}
+        if entry.get('values'):
+            args[f'values{player}'] = entry['values']
+        return args
+
+    def play(self, agents=None, rounds=1, pairings=4, games=4, workers=None, verbose=True):
+        """Play rounds of games on the most informative pairings, updating and
+        saving the table after each round. Every round plays new seeds, so
+        its results are never counted twice."""
+        for _ in range(rounds):
+            jobs = []
+            for name1, name2 in self.schedule(agents, pairings):
+                for index in range(games):
+                    seed = self.next_seed + index // 2
+                    first, second = (name1, name2) if index % 2 == 0 else (name2, name1)
+                    jobs.append(dict(self.job_args(first, 1), **self.job_args(second, 2), seed=seed))
+            self.next_seed += (games + 1) // 2
+
+            for result in play_matches(jobs, workers):
+                self.record(result)
+            self.save()
+            if verbose:
+                print(self.report())
+                print()
+
+    def report(self):
+        """Ratings table, strongest first, with a 95% interval"""
+        lines = [f"{'agent':<14}{'rating':>8}{'+/-':>6}{'games':>7}{'W':>5}{'D':>4}{'L':>5}"]
+        for agent, entry in sorted(self.ratings.items(), key=lambda item: -item[1]['rating']):
+            lines.append(f"{agent:<14}{entry['rating']:>8.0f}{1.96 * entry['deviation']:>6.0f}"
+                         f"{entry['games']:>7}{entry['wins']:>5}{entry['draws']:>4}{entry['losses']:>5}")
+        return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Persistent Glicko rating ladder of agents")
+    parser.add_argument("command", choices=['show', 'ingest', 'play', 'schedule'])
+    parser.add_argument("--ladder", default='ladder.json', help="JSON file holding the ratings")
+    parser.add_argument("--results", nargs='*', default=[], help="tournament.py results files for ingest")
+    parser.add_argument("--agents", nargs='+', default=None,
+                        help="agents or rated variants (agent@values) to schedule, default every rated one")
+    parser.add_argument("--rounds", type=int, default=1)
+    parser.add_argument("--pairings", type=int, default=4, help="pairings scheduled per round")
+    parser.add_argument("--games", type=int, default=4, help="games per pairing and round, colours alternate")
+    parser.add_argument("--workers", type=int, default=None, help="parallel game processes")
+    args = parser.parse_args()
+
+    ladder = Ladder(args.ladder)
+    for name in args.agents or ():
+        if name in ladder.ratings:
+            continue  # Rated variants (agent@values) play with their stored values
+        try:
+            resolve_agent(name)
+        except ValueError as error:
+            parser.error(str(error))
+
+    if args.command == 'ingest':
+        for path in args.results:
+            print(f"{path}: {ladder.ingest(path)} new results")
+    elif args.command == 'play':
+        ladder.play(args.agents, args.rounds, args.pairings, args.games, args.workers)
+    elif args.command == 'schedule':
+        for agent1, agent2 in ladder.schedule(args.agents, args.pairings):
+            print(f"{agent1} vs {agent2}: {ladder.information(agent1, agent2):.0f}")
+        return
+    print(ladder.report())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,366 @@
+import os
+import sys
+import random
+import operator
+import itertools
+import argparse
+import multiprocessing
+from functools import lru_cache, reduce
+from collections import defaultdict, deque
+from environment_constants import *
+from cells import DIRECTIONS
+from snake import Rivals
+
+RADIUS = VISIBILITY_RANGE
+SIDE = 2 * RADIUS + 1                   # Window side, 5 for the default range
+ROW_MASK = (1 << SIDE) - 1
+WINDOW_BITS = SIDE * SIDE
+# Only cells within RADIUS steps of the head (a diamond) go into the key; the
+# corners add many rare states and little about the next move
+DIAMOND = sum(1 << (y * SIDE + x) for y in range(SIDE) for x in range(SIDE)
+              if 0 < abs(x - RADIUS) + abs(y - RADIUS) <= RADIUS)
+KEY_MASK = DIAMOND | DIAMOND << WINDOW_BITS
+DIRECTION_CODES = {direction: index for index, direction in enumerate(DIRECTIONS)}
+DIRECTION_CODES[(0, 0)] = len(DIRECTIONS)
+
+ZEROS = itertools.repeat(0)   # Default bit of off-grid cells in map(bits.get, ...)
+
+DEFAULT_TABLE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tables', 'lut.npz')
+SEED_OFFSET = 400_000   # Distillation games use their own seeds
+MIN_VOTES = 2           # Teacher decisions needed before a table move is trusted
+
+
+class WindowTables:
+    """
+    Bit positions on a board padded by RADIUS cells on every side, so the
+    window around any head is SIDE shifts of SIDE bits and never needs
+    bounds checks. The padding is marked blocked (walls).
+    """
+
+    def __init__(self, width, height):
+        self.width = width
+        self.pitch = width + 2 * RADIUS
+        self.bits = {(x, y): 1 << ((y + RADIUS) * self.pitch + x + RADIUS)
+                     for y in range(height) for x in range(width)}
+
+        walls = 0
+        for y in range(height + 2 * RADIUS):
+            for x in range(self.pitch):
+                if not (RADIUS <= x < width + RADIUS and RADIUS <= y < height + RADIUS):
+                    walls |= 1 << (y * self.pitch + x)
+        self.walls = walls
+
+        # Offsets of the four neighbours of the window centre, in window bits
+        centre = RADIUS * SIDE + RADIUS
+        self.neighbour_bits = tuple(1 << (centre + dy * SIDE + dx) for dx, dy in DIRECTIONS)
+
+
+@lru_cache(maxsize=None)
+def window_tables(width, height):
+    return WindowTables(width, height)
+
+
+class BodyBits:
+    """
+    Bitboard of one snake's body on the padded board, kept in step with the
+    body: a sync costs a bit flip per head added and tail cell removed since
+    the last one, not a pass over the body. Anything else (a new game, a
+    loaded state, overlapping cells after a collision) shows up as ends that
+    do not match and rebuilds the board.
+    """
+    MAX_HEADS = 4   # New heads looked for before giving up and rebuilding
+
+    def __init__(self, bits):
+        self.bits = bits
+        self.cells = deque()    # The body as of the last sync
+        self.board = 0
+
+    def sync(self, body):
+        """Board of body, updated from the last sync"""
+        cells = self.cells
+        if cells:
+            # Usual case: one move, the tail followed unless the snake grew
+            if len(body) > 1 and body[1] == cells[0]:
+                bits = self.bits
+                board = self.board
+                if len(cells) == len(body):
+                    board &= ~bits.get(cells.pop(), 0)
+                bit = bits.get(body[0], 0)
+                if not board & bit and len(cells) + 1 == len(body):
+                    cells.appendleft(body[0])
+                    if cells[-1] == body[-1]:
+                        self.board = board | bit
+                        return self.board
+            elif self.advance(body) and cells[0] == body[0] and cells[-1] == body[-1]:
+                return self.board
+        self.cells = deque(body)
+        self.board = reduce(operator.or_, map(self.bits.get, body, ZEROS), 0)
+        return self.board
+
+    def advance(self, body):
+        """Apply the tail cells removed and heads added since the last sync,
+        False if body did not get here by moving"""
+        cells = self.cells
+        bits = self.bits
+        head = cells[0]
+        added = 0
+        while added < len(body) and body[added] != head:
+            added += 1
+            if added > self.MAX_HEADS:
+                return False
+        removed = len(cells) + added - len(body)
+        if added == len(body) or not 0 <= removed < len(cells):
+            return False
+
+        board = self.board
+        for _ in range(removed):
+            board &= ~bits.get(cells.pop(), 0)
+        for index in range(added - 1, -1, -1):
+            position = body[index]
+            bit = bits.get(position, 0)
+            if board & bit:
+                return False
+            board |= bit
+            cells.appendleft(position)
+        self.board = board
+        return True
+
+
+class WindowEncoder:
+    """
+    Packs the SIDE x SIDE window around a snake's head into one integer:
+    two planes of WINDOW_BITS bits (low: blocked or trap, high: food or
+    trap, so every cell is empty 0, blocked 1, food 2 or trap 3) masked to
+    the cells within RADIUS steps of the head, then the
+    current direction (3 bits) and the sign of the offset to the nearest
+    food (4 bits). Item planes are rebuilt only when food_manager.version
+    changes, body planes follow every snake's moves (BodyBits).
+    """
+
+    def __init__(self, grid, food_manager):
+        self.grid = grid
+        self.food_manager = food_manager
+        self.tables = window_tables(grid.width, grid.height)
+        self.version = None
+        self.food = 0
+        self.traps = 0
+        self.bodies = {}    # snake -> BodyBits
+
+    def item_planes(self):
+        if self.version != self.food_manager.version:
+            bits = self.tables.bits
+            self.food = 0
+            for item in self.food_manager.normal_food_items + self.food_manager.super_food_items:
+                self.food |= bits[item.position]
+            self.traps = 0
+            for item in self.food_manager.spike_trap_items:
+                self.traps |= bits[item.position]
+            self.version = self.food_manager.version
+        return self.food, self.traps
+
+    def body_bits(self, snake):
+        """Board of a snake's body"""
+        tracker = self.bodies.get(snake)
+        if tracker is None:
+            tracker = self.bodies[snake] = BodyBits(self.tables.bits)
+        return tracker.sync(snake.body)
+
+    def opponent_bits(self, snake, opponent):
+        """Board of the opponent, or of every other snake still in the game"""
+        if isinstance(opponent, Rivals):
+            board = 0
+            for other in opponent.snakes:
+                if other is not snake and other.alive:
+                    board |= self.body_bits(other)
+            return board
+        return self.body_bits(opponent)
+
+    def encode(self, snake, opponent):
+        """Window key of snake's head for this tick"""
+        tables = self.tables
+        bits = tables.bits
+        body = snake.body
+
+        # Own body without head and tail (the tail moves away), the whole opponent
+        ends = bits.get(body[0], 0) | bits.get(body[-1], 0)
+        blocked = tables.walls | self.opponent_bits(snake, opponent) | (self.body_bits(snake) & ~ends)
+
+        food, traps = self.item_planes()
+        low = blocked | traps
+        high = food | traps
+
+        # Cut SIDE rows of SIDE bits out of both planes
+        head_x, head_y = body[0]
+        pitch = tables.pitch
+        shift = head_y * pitch + head_x  # Top-left of the window on the padded board
+        key = 0
+        for row in range(SIDE):
+            key |= ((low >> shift) & ROW_MASK) << (row * SIDE)
+            key |= ((high >> shift) & ROW_MASK) << (WINDOW_BITS + row * SIDE)
+            shift += pitch
+        key &= KEY_MASK
+
+        key |= DIRECTION_CODES[snake.direction] << (2 * WINDOW_BITS)
+        key |= self.food_sign(body[0]) << (2 * WINDOW_BITS + 3)
+        return key
+
+    def food_sign(self, head):
+        """Sign of the offset to the nearest food as a 0-8 code"""
+        best = None
+        best_distance = None
+        for items in (self.food_manager.normal_food_items, self.food_manager.super_food_items):
+            for item in items:
+                x, y = item.position
+                distance = abs(x - head[0]) + abs(y - head[1])
+                if best_distance is None or distance < best_distance:
+                    best, best_distance = item.position, distance
+        if best is None:
+            return 4  # (0, 0)
+        sign_x = (best[0] > head[0]) - (best[0] < head[0])
+        sign_y = (best[1] > head[1]) - (best[1] < head[1])
+        return (sign_y + 1) * 3 + sign_x + 1
+
+
+@lru_cache(maxsize=None)
+def load_table(path, min_votes=MIN_VOTES):
+    """Window key -> direction index table saved by distill(), {} (with a
+    warning, once per path) if missing. Keys whose majority move got fewer
+    than min_votes teacher decisions are left out, the fallback plays better
+    than a single noisy sample."""
+    if not os.path.exists(path):
+        print(f"Warning: no lookup table at {path}, the lut agent only plays its greedy fallback "
+              f"(build the table with lut_agent.py)", file=sys.stderr)
+        return {}
+    import numpy as np
+    with np.load(path) as data:
+        keep = data['counts'].max(axis=1) >= min_votes
+        return dict(zip(data['keys'][keep].tolist(), data['moves'][keep].tolist()))
+
+
+class LookupAgent:
+    """
+    Table-driven agent: the packed window around the head is looked up in a
+    table distilled from the search agents, so a decision costs one encode
+    and one dict lookup. Moves the table does not know, or that would enter
+    a blocked cell, fall back to a greedy choice read from the same key.
+    """
+
+    def __init__(self, snake, opponent, grid, food_manager, table=DEFAULT_TABLE, min_votes=MIN_VOTES,
+                 values=None):
+        self.snake = snake
+        self.opponent = opponent
+        self.grid = grid
+        self.food_manager = food_manager
+        self.values = dict(values or {})  # No tunable values, kept for the arena interface
+        self.encoder = WindowEncoder(grid, food_manager)
+        self.table = load_table(table, min_votes)
+        self.tables = self.encoder.tables
+        self.hits = 0
+        self.misses = 0
+
+    def make_move(self):
+        key = self.encoder.encode(self.snake, self.opponent)
+        move = self.table.get(key)
+        if move is not None and self.is_open(key, move):
+            self.hits += 1
+        else:
+            self.misses += 1
+            move = self.fallback(key)
+        self.snake.update_move(DIRECTIONS[move])
+
+    def is_open(self, key, move):
+        """Whether the neighbour in direction index move is free of walls and bodies"""
+        bit = self.tables.neighbour_bits[move]
+        if key & bit and not key & (bit << WINDOW_BITS):
+            return False  # Blocked (low plane only)
+        direction = DIRECTIONS[move]
+        return direction in self.snake.get_available_dire(self.snake.direction)
+
+    def fallback(self, key):
+        """Open move towards the nearest food, avoiding traps when possible"""
+        sign = key >> (2 * WINDOW_BITS + 3)
+        sign_x, sign_y = sign % 3 - 1, sign // 3 - 1
+        best_move, best_score = 0, None  # Boxed in: every move loses
+        for move, (dx, dy) in enumerate(DIRECTIONS):
+            if not self.is_open(key, move):
+                continue
+            bit = self.tables.neighbour_bits[move]
+            score = dx * sign_x + dy * sign_y
+            if key & bit:
+                score -= 10  # Trap
+            if best_score is None or score > best_score:
+                best_move, best_score = move, score
+        return best_move
+
+
+def _distill_game(job):
+    """Play one game with teachers on both snakes, return the (key, move) decisions"""
+    from game_logic import Game
+
+    seed, teacher1, teacher2 = job
+    random.seed(seed)
+    # Simultaneous turns, so both teachers decide on the board that was encoded
+    game = Game(headless=True, agent1=teacher1, agent2=teacher2, simultaneous=True)
+    encoder = WindowEncoder(game.grid, game.food_manager)
+    samples = []
+    # The MAX_TURNS tick only scores the game, nobody moves on it
+    while not game.game_over and game.turn_count + 1 < MAX_TURNS:
+        keys = [encoder.encode(game.snake1, game.snake2), encoder.encode(game.snake2, game.snake1)]
+        game.update()
+        for key, snake in zip(keys, (game.snake1, game.snake2)):
+            if snake.direction in DIRECTION_CODES and snake.direction != (0, 0):
+                samples.append((key, DIRECTION_CODES[snake.direction]))
+    return samples
+
+
+def distill(path=DEFAULT_TABLE, teachers=('astar', 'local'), games=2000, workers=None, seed=0,
+            verbose=True):
+    """
+    Play games between the teacher agents (every ordered pairing), record
+    each teacher decision under its window key and save the majority move
+    of every key. Returns the number of keys in the table.
+    """
+    import numpy as np
+
+    jobs = [(SEED_OFFSET + seed * games + index,
+             teachers[index % len(teachers)], teachers[(index // len(teachers)) % len(teachers)])
+            for index in range(games)]
+    votes = defaultdict(lambda: [0] * len(DIRECTIONS))
+    samples = 0
+    with multiprocessing.Pool(workers) as pool:
+        for done, decisions in enumerate(pool.imap_unordered(_distill_game, jobs, chunksize=8), start=1):
+            for key, move in decisions:
+                votes[key][move] += 1
+            samples += len(decisions)
+            if verbose and done % 200 == 0:
+                print(f"{done}/{games} games, {samples} decisions, {len(votes)} keys")
+
+    keys = np.fromiter(votes, dtype=np.uint64, count=len(votes))
+    counts = np.array(list(votes.values()), dtype=np.uint32)
+    order = np.argsort(keys)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = path + '.tmp.npz'
+    np.savez_compressed(tmp_path, keys=keys[order], moves=counts[order].argmax(axis=1).astype(np.uint8),
+                        counts=counts[order])
+    os.replace(tmp_path, path)
+    load_table.cache_clear()
+    if verbose:
+        print(f"Saved {len(votes)} keys from {samples} decisions to {path}")
+    return len(votes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Distil a lookup-table agent from the search agents")
+    parser.add_argument("--table", default=DEFAULT_TABLE, help="output .npz table")
+    parser.add_argument("--teachers", nargs='+', default=['astar', 'local'], help="agents whose moves are copied")
+    parser.add_argument("--games", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=None, help="parallel game processes")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    distill(args.table, args.teachers, args.games, args.workers, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,103 @@
 import pygame
 import sys
+import argparse
+from environment_constants import DEFAULT_AGENT1, DEFAULT_AGENT2
+from agents import agent_names, resolve_agent
 from game_logic import Game
 
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Snake AI Competition")
+    parser.add_argument("--agent1", default=DEFAULT_AGENT1,
+                        help=f"agent of the blue snake, one of {', '.join(agent_names())} or module:Class")
+    parser.add_argument("--agent2", default=DEFAULT_AGENT2, help="agent of the orange snake")
+    parser.add_argument("--agents", nargs='+', metavar="AGENT",
+                        help="one agent per snake for games with more than two snakes")
+    parser.add_argument("--simultaneous", action="store_true",
+                        help="let every agent decide before any snake moves")
+    parser.add_argument("--telemetry", metavar="DIR",
+                        help="record per-turn telemetry shards into DIR")
+    parser.add_argument("--record", metavar="FILE",
+                        help="write every turn to a replay archive FILE")
+    parser.add_argument("--replay", metavar="FILE",
+                        help="open a replay archive in the viewer instead of playing")
+    parser.add_argument("--game", type=int, default=0, help="first game shown by the viewer")
+    parser.add_argument("--turn", type=int, default=0, help="first turn shown by the viewer")
+    args = parser.parse_args()
+
+    for name in args.agents or (args.agent1, args.agent2):
+        try:
+            resolve_agent(name)
+        except ValueError as error:
+            parser.error(str(error))
+    if args.record and args.agents and len(args.agents) != 2:
+        parser.error("--record stores two-snake games, use --agents with two agents or none")
+    return args
+
+def view_replay(path, game_index, turn):
+    """Browse a replay archive: LEFT/RIGHT step turns, UP/DOWN switch games, SPACE plays"""
+    from replay import ReplayArchive
+
+    archive = ReplayArchive(path)
+    game = Game()
+    clock = pygame.time.Clock()
+    playing = False
+    running = True
+
+    while running:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_RIGHT:
+                    turn += 1
+                elif event.key == pygame.K_LEFT:
+                    turn -= 1
+                elif event.key == pygame.K_UP:
+                    game_index, turn = game_index + 1, 0
+                elif event.key == pygame.K_DOWN:
+                    game_index, turn = game_index - 1, 0
+                elif event.key == pygame.K_SPACE:
+                    playing = not playing
+
+        if playing:
+            turn += 1
+
+        # Keep the position inside the archive
+        game_index = max(0, min(game_index, len(archive) - 1))
+        turn = max(0, min(turn, archive.game_length(game_index) - 1))
+
+        game.load_state(archive.load_turn(game_index, turn))
+        game.render()
+        pygame.display.set_caption(f"Replay - game {game_index} turn {turn}")
+        clock.tick(5)
+
+    archive.close()
+    pygame.quit()
+    sys.exit()
+
 def main():
+    args = parse_args()
+
     # Initialize pygame
     pygame.init()
 
+    if args.replay:
+        view_replay(args.replay, args.game, args.turn)
+
+    telemetry = None
+    if args.telemetry:
+        from telemetry import TelemetryWriter
+        telemetry = TelemetryWriter(args.telemetry)
+
+    replay = None
+    if args.record:
+        from replay import ReplayWriter
+        replay = ReplayWriter(args.record)
+
     # Create game instance
-    game = Game()
+    game = Game(telemetry, replay, agent1=args.agent1, agent2=args.agent2, agents=args.agents,
+                simultaneous=args.simultaneous)
 
     # Main game loop
     running = True
@@ -28,9 +118,14 @@ def main():
 
         # Cap the frame rate
         clock.tick(5)  # 15 frames per second matches the snake speed from your proposal
-    print("Agent 1 takes:",game.snake1.get_total_time(),"ms, and Agent 2 takes: ", game.snake2.get_total_time()," ms")
+    for index, snake in enumerate(game.snakes, start=1):
+        print(f"Agent {index} takes:", snake.get_total_time(), "ms")
     print("Total steps is :", game.turn_count)
     # Cleanup and exit
+    if telemetry is not None:
+        telemetry.close()
+    if replay is not None:
+        replay.close()
     pygame.quit()
     sys.exit()
 
@@ -0,0 +1,169 @@
+import gc
+import sys
+import random
+import argparse
+import tracemalloc
+from array import array
+from statistics import median
+from environment_constants import *
+from game_logic import Game
+from game_grid import Grid
+from cache import clear_caches
+
+
+class TickTracer:
+    """
+    Splits the tracemalloc peak of a tick into the agents' decisions and
+    the rest of update() (the engine). Agent make_move methods are wrapped
+    so every decision is traced on its own; what a decision keeps (the
+    moved head, cache entries) is not charged to the engine. Decision peaks
+    are only kept while recording is set.
+    """
+
+    def __init__(self):
+        self.start = self.decision_start = 0
+        self.tick = self.engine = 0
+        self.recording = False
+        self.decisions = {}     # agent name -> peaks of its decisions
+
+    def watch(self, name, agent):
+        """Trace every make_move of agent under name"""
+        peaks = self.decisions.setdefault(name, array('q'))
+        make_move = agent.make_move
+
+        def traced_make_move():
+            self.pause()
+            make_move()
+            self.resume(peaks)
+
+        agent.make_move = traced_make_move
+
+    def begin(self):
+        self.start = tracemalloc.get_traced_memory()[0]
+        self.tick = self.engine = 0
+        tracemalloc.reset_peak()
+
+    def pause(self):
+        """End an engine stretch, a decision starts"""
+        current, peak = tracemalloc.get_traced_memory()
+        self.engine = max(self.engine, peak - self.start)
+        self.decision_start = current
+        tracemalloc.reset_peak()
+
+    def resume(self, peaks):
+        """End a decision, the engine continues"""
+        current, peak = tracemalloc.get_traced_memory()
+        if self.recording:
+            peaks.append(peak - self.decision_start)
+        self.tick = max(self.tick, self.engine, peak - self.start)
+        self.start += current - self.decision_start
+        tracemalloc.reset_peak()
+
+    def end(self):
+        self.pause()
+        self.tick = max(self.tick, self.engine)
+
+
+def measure(agents=(DEFAULT_AGENT1, DEFAULT_AGENT2), games=20, warmup_games=ALLOCATION_WARMUP_GAMES, seed=0):
+    """
+    Play warmup_games and then games headless games and measure the memory
+    of the measured ones in two ways:
+    - around every update() while the game runs, the traced memory it
+      allocates on top of what it started with (tracemalloc peak), which
+      catches short-lived allocations freed before the tick ends. The
+      engine's part of the tick and every agent decision are traced
+      separately (see TickTracer);
+    - once a game is over and freed, the memory blocks it left behind
+      (bounded per-game caches, emptied by the next game, do not count),
+      which catches leaks.
+    Returns ticks, peak_bytes (median tick), engine_peak_bytes (median
+    engine part), decision_peak_bytes (agent name -> median decision),
+    max_peak_bytes and blocks_per_tick.
+    """
+    Grid().tables.preload()
+    enabled = gc.isenabled()
+    gc.disable()  # Collections inside a tick would move its peak
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    # Arrays, not lists: the int objects of a list would count as kept blocks
+    peaks = array('q')
+    engine_peaks = array('q')
+    blocks = 0
+    tracer = TickTracer()
+    try:
+        for index in range(warmup_games + games):
+            start_blocks = sys.getallocatedblocks()
+            random.seed(seed + index)
+            game = Game(headless=True, agents=agents, diffs=False)
+            # Warm-up games are traced too, so the tracer's own first-use allocations are not measured
+            tracer.recording = index >= warmup_games
+            for name, agent in zip(game.agent_names, game.agents):
+                if agent is not None:
+                    tracer.watch(name, agent)
+            while not game.game_over:
+                tracer.begin()
+                game.update()
+                tracer.end()
+                if index >= warmup_games:
+                    peaks.append(tracer.tick)
+                    engine_peaks.append(tracer.engine)
+            del game
+            clear_caches()
+            gc.collect()
+            if index >= warmup_games:
+                blocks += sys.getallocatedblocks() - start_blocks
+    finally:
+        if not tracing:
+            tracemalloc.stop()
+        if enabled:
+            gc.enable()
+    ticks = max(len(peaks), 1)
+    return {'ticks': len(peaks), 'peak_bytes': median(peaks or [0]), 'max_peak_bytes': max(peaks or [0]),
+            'engine_peak_bytes': median(engine_peaks or [0]),
+            'decision_peak_bytes': {name: median(values) for name, values in tracer.decisions.items() if values},
+            'blocks_per_tick': blocks / ticks}
+
+
+def over_budget(result, engine_budget=ALLOCATION_ENGINE_BUDGET, decision_budgets=ALLOCATION_DECISION_BUDGETS,
+                blocks_budget=ALLOCATION_BUDGET):
+    """Names of the budgets a measure() result goes over (agents without a budget are not checked)"""
+    over = []
+    if result['engine_peak_bytes'] > engine_budget:
+        over.append('engine')
+    for name, peak in result['decision_peak_bytes'].items():
+        if name in decision_budgets and peak > decision_budgets[name]:
+            over.append(name)
+    if result['blocks_per_tick'] > blocks_budget:
+        over.append('kept blocks')
+    return over
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check what steady-state game ticks allocate and keep")
+    parser.add_argument("--agents", nargs='+', action='append',
+                        help="one agent per snake, repeat the option for more line-ups (default: every pairing "
+                             "of astar, local and lut)")
+    parser.add_argument("--games", type=int, default=20, help="measured games per line-up")
+    parser.add_argument("--engine-budget", type=int, default=ALLOCATION_ENGINE_BUDGET,
+                        help="bytes the engine's part of the median tick may allocate")
+    parser.add_argument("--budget", type=float, default=ALLOCATION_BUDGET, help="memory blocks a tick may keep")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    lineups = args.agents or [['astar', 'local'], ['astar', 'astar'], ['local', 'local'], ['lut', 'lut']]
+    failed = False
+    for agents in lineups:
+        result = measure(agents, args.games, seed=args.seed)
+        over = over_budget(result, args.engine_budget, blocks_budget=args.budget)
+        failed |= bool(over)
+        decisions = '  '.join(f"{name} {peak / 1024:.1f}" for name, peak in result['decision_peak_bytes'].items())
+        print(f"{' vs '.join(agents):20} {result['ticks']:6} ticks  {result['peak_bytes'] / 1024:5.1f} KB/tick "
+              f"(max {result['max_peak_bytes'] / 1024:.1f}, engine {result['engine_peak_bytes'] / 1024:.1f}, "
+              f"{decisions})  {result['blocks_per_tick']:5.2f} blocks kept/tick  "
+              f"{'OVER BUDGET: ' + ', '.join(over) if over else 'ok'}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
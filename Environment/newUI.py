@@ -1,16 +1,16 @@
 import pygame
 from environment_constants import *
+from assets import load_font
 from random import randint
 import random
 
 class UI:
     def __init__(self, screen):
         self.screen = screen
-        # Use better fonts with more variety
-        pygame.font.init()
-        self.title_font = pygame.font.SysFont('monospace', 32, bold=True)
-        self.font = pygame.font.SysFont('monospace', 24, bold=True)
-        self.small_font = pygame.font.SysFont('monospace', 20, bold=True)
+        # Use better fonts with more variety (created once per process)
+        self.title_font = load_font('monospace', 32, bold=True)
+        self.font = load_font('monospace', 24, bold=True)
+        self.small_font = load_font('monospace', 20, bold=True)
         
         # Create rounded rectangle surface for reuse
         self.rounded_rect_cache = {}
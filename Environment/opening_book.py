@@ -0,0 +1,222 @@
+import os
+import itertools
+import json
+import random
+import argparse
+import multiprocessing
+from functools import lru_cache
+from collections import defaultdict
+from environment_constants import *
+from cells import DIRECTIONS
+from symmetry import canonical_window, transform_direction, inverse_direction
+
+RADIUS = VISIBILITY_RANGE
+# Window cells: everything within RADIUS steps of the head, in a fixed order
+OFFSETS = tuple((dx, dy) for dy in range(-RADIUS, RADIUS + 1) for dx in range(-RADIUS, RADIUS + 1)
+                if 0 < abs(dx) + abs(dy) <= RADIUS)
+FOOD_CLIP = RADIUS + 1      # Offset to the nearest food is clipped to this many cells
+
+EMPTY, BLOCKED, NORMAL_FOOD, SUPER_FOOD, TRAP = range(5)
+ITEM_CODES = {'normal': NORMAL_FOOD, 'super': SUPER_FOOD, 'trap': TRAP}
+
+DEFAULT_BOOK = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tables', 'opening_book.json')
+SEED_OFFSET = 500_000   # Book building games use their own seeds
+
+
+class OpeningBook:
+    """
+    Persistent position -> move table for the opening, while snakes are at
+    most max_length cells long. Positions are the cells within RADIUS steps
+    of the head, the current direction and the offset to the nearest food,
+    reduced to the smallest of their 8 rotations and reflections, so
+    mirrored openings share an entry. Moves are stored in that canonical
+    orientation and turned back on lookup.
+    """
+
+    def __init__(self, entries=None, max_length=OPENING_BOOK_MAX_LENGTH, min_votes=1):
+        self.entries = entries or {}    # canonical key string -> direction index
+        self.max_length = max_length
+        self.min_votes = min_votes
+        self.lookups = 0
+        self.hits = 0
+
+    @classmethod
+    def load(cls, path, min_votes=OPENING_BOOK_MIN_VOTES):
+        """Read a book written by build(), an empty book if the file is missing"""
+        if not os.path.exists(path):
+            return cls(min_votes=min_votes)
+        with open(path) as f:
+            data = json.load(f)
+        entries = {key: move for key, (move, votes) in data['entries'].items() if votes >= min_votes}
+        return cls(entries, data['max_length'], min_votes)
+
+    def position(self, snake, opponent, food_manager, grid):
+        """Window codes, direction and clipped food offset of snake's head"""
+        head_x, head_y = snake.body[0]
+        blocked = set(opponent.body)
+        blocked.update(itertools.islice(snake.body, 1, len(snake.body) - 1))  # The tail moves away
+
+        codes = []
+        for dx, dy in OFFSETS:
+            position = (head_x + dx, head_y + dy)
+            if position in blocked or not grid.is_valid_position(position):
+                codes.append(BLOCKED)
+            else:
+                item = food_manager.item_at(position)
+                codes.append(ITEM_CODES[item.kind] if item is not None else EMPTY)
+
+        food = (0, 0)
+        best = None
+        for items in (food_manager.normal_food_items, food_manager.super_food_items):
+            for item in items:
+                x, y = item.position
+                distance = abs(x - head_x) + abs(y - head_y)
+                if best is None or distance < best:
+                    best = distance
+                    food = (max(-FOOD_CLIP, min(FOOD_CLIP, x - head_x)),
+                            max(-FOOD_CLIP, min(FOOD_CLIP, y - head_y)))
+        return codes, snake.direction, food
+
+    def canonical(self, codes, direction, food):
+        """(key string, transform) of the smallest symmetric variant of a position"""
+        key, transform = canonical_window(codes, OFFSETS, (direction, food))
+        return ','.join(map(str, key)), transform
+
+    def probe(self, snake, opponent, food_manager, grid):
+        """Book move for snake, or None when the position is not in the book,
+        the snake is past the opening, or the move would hit a wall or body"""
+        if len(snake.body) > self.max_length:
+            return None
+        self.lookups += 1
+        codes, direction, food = self.position(snake, opponent, food_manager, grid)
+        key, transform = self.canonical(codes, direction, food)
+        move = self.entries.get(key)
+        if move is None:
+            return None
+
+        direction = inverse_direction(DIRECTIONS[move], transform)
+        if direction not in snake.get_available_dire(snake.direction):
+            return None
+        if codes[OFFSETS.index(direction)] == BLOCKED:
+            return None
+        self.hits += 1
+        return direction
+
+    def reset_counters(self):
+        self.lookups = 0
+        self.hits = 0
+
+    def hit_rate(self):
+        return self.hits / self.lookups if self.lookups else 0.0
+
+    def report(self):
+        return (f"opening book: {len(self.entries)} positions, {self.lookups} lookups, "
+                f"{self.hits} hits ({100 * self.hit_rate():.1f}%)")
+
+
+@lru_cache(maxsize=None)
+def load_book(path=DEFAULT_BOOK, min_votes=OPENING_BOOK_MIN_VOTES):
+    """Book shared by every agent of the process, so its hit counters add up"""
+    return OpeningBook.load(path, min_votes)
+
+
+def _book_game(job):
+    """Play one teacher game, return the (canonical key, canonical move) decisions of the opening"""
+    from game_logic import Game
+
+    seed, teacher, max_length = job
+    random.seed(seed)
+    # Simultaneous turns, so both teachers decide on the position that was read
+    game = Game(headless=True, agent1=teacher, agent2=teacher, simultaneous=True)
+    book = OpeningBook(max_length=max_length)
+    samples = []
+    while not game.game_over:
+        pending = []
+        for snake, opponent in ((game.snake1, game.snake2), (game.snake2, game.snake1)):
+            if len(snake.body) <= max_length:
+                pending.append((snake, book.canonical(*book.position(snake, opponent, game.food_manager,
+                                                                      game.grid))))
+        if not pending:
+            break  # Both snakes are past the opening
+        game.update()
+        for snake, (key, transform) in pending:
+            if snake.direction != (0, 0):
+                samples.append((key, DIRECTIONS.index(transform_direction(snake.direction, transform))))
+    return samples
+
+
+def build(path=DEFAULT_BOOK, teacher='astar-timed', games=5000, max_length=OPENING_BOOK_MAX_LENGTH,
+          workers=None, seed=0, verbose=True):
+    """
+    Fill the book from the opening moves of teacher self-play games (the
+    teacher should be a deep, slow search) and save the majority move of
+    every position. Returns the number of positions.
+    """
+    jobs = [(SEED_OFFSET + seed * games + index, teacher, max_length) for index in range(games)]
+    votes = defaultdict(lambda: [0] * len(DIRECTIONS))
+    with multiprocessing.Pool(workers) as pool:
+        for decisions in pool.imap_unordered(_book_game, jobs, chunksize=16):
+            for key, move in decisions:
+                votes[key][move] += 1
+
+    entries = {}
+    for key, counts in votes.items():
+        move = max(range(len(DIRECTIONS)), key=counts.__getitem__)
+        entries[key] = [move, counts[move]]
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump({'teacher': teacher, 'games': games, 'max_length': max_length, 'entries': entries}, f)
+    os.replace(tmp_path, path)
+    load_book.cache_clear()
+    if verbose:
+        print(f"Saved {len(entries)} positions from {sum(map(sum, votes.values()))} decisions to {path}")
+    return len(entries)
+
+
+def report(path=DEFAULT_BOOK, agent='astar-book', opponent='local', games=100, seed=0):
+    """Play games in this process with agent using the book at path, and
+    return the book with the lookup and hit counters of these games (the
+    book is shared through load_book, so earlier counts are reset)"""
+    from game_logic import Game
+    from agents import register_agent, resolve_agent
+
+    module, class_name, kwargs = resolve_agent(agent)
+    register_agent('book-report', module, class_name, **dict(kwargs, book=path))
+    book = None
+    for index in range(games):
+        random.seed(SEED_OFFSET - 1 - seed * games - index)  # Apart from the building seeds
+        game = Game(headless=True, agent1='book-report', agent2=opponent)
+        if book is None:
+            book = game.ai1.book  # The agents' shared book (this file may run as __main__)
+            book.reset_counters()
+        while not game.game_over:
+            game.update()
+    return book
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or check the opening book")
+    parser.add_argument("command", choices=['build', 'report'])
+    parser.add_argument("--book", default=DEFAULT_BOOK, help="book JSON file")
+    parser.add_argument("--teacher", default='astar-timed', help="agent whose opening moves fill the book")
+    parser.add_argument("--agent", default='astar-book', help="book agent played by report")
+    parser.add_argument("--opponent", default='local')
+    parser.add_argument("--games", type=int, default=5000)
+    parser.add_argument("--max-length", type=int, default=OPENING_BOOK_MAX_LENGTH,
+                        help="snakes longer than this are past the opening")
+    parser.add_argument("--workers", type=int, default=None, help="parallel game processes")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        build(args.book, args.teacher, args.games, args.max_length, args.workers, args.seed)
+    else:
+        print(report(args.book, args.agent, args.opponent, args.games, args.seed).report())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+from itertools import chain, islice
+from environment_constants import *
+
+_column_masks = {}
+
+
+def column_masks(width, height):
+    """Masks that stop horizontal shifts from wrapping into the next row (cached per grid size)"""
+    key = (width, height)
+    if key not in _column_masks:
+        full = (1 << (width * height)) - 1
+        first_column = 0
+        for y in range(height):
+            first_column |= 1 << (y * width)
+        last_column = first_column << (width - 1)
+        _column_masks[key] = (full & ~first_column, full & ~last_column)
+    return _column_masks[key]
+
+
+class ReachabilityMap:
+    """
+    Free space of the board for one tick stored as a bitset (one bit per
+    cell, bit y * width + x). Connected regions are found with a bitset
+    flood fill and cached, so checking the up-to-four candidate moves of a
+    tick costs at most one flood fill per region.
+    """
+
+    def __init__(self, width, height, blocked_cells):
+        self.width = width
+        self.height = height
+
+        full = (1 << (width * height)) - 1
+        blocked = 0
+        for x, y in blocked_cells:
+            if 0 <= x < width and 0 <= y < height:
+                blocked |= 1 << (y * width + x)
+        self.free = full & ~blocked
+
+        self.not_first_column, self.not_last_column = column_masks(width, height)
+
+        self.regions = []  # (bitset, size) of every region found so far
+        self.partial = []  # (bitset, size) of parts of regions, grown only as far as is_safe needed
+
+    @classmethod
+    def for_snake(cls, snake, opponent, grid):
+        """Free space as seen by snake: its body (the tail will move) and the visible opponent are blocked"""
+        body = snake.body
+        return cls(grid.width, grid.height, chain(islice(body, len(body) - 1), snake.radar(opponent)))
+
+    def bit(self, position):
+        """Bit of a position, 0 if it is outside the grid"""
+        x, y = position
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return 1 << (y * self.width + x)
+        return 0
+
+    def region(self, position):
+        """Return (bitset, size) of the free region containing position"""
+        bit = self.bit(position) & self.free
+        if not bit:
+            return 0, 0
+
+        for region in self.regions:
+            if region[0] & bit:
+                return region
+
+        # Grow the region one step in all four directions until it stops changing
+        free = self.free
+        width = self.width
+        region = bit
+        while True:
+            grown = (region
+                     | ((region << 1) & self.not_first_column)
+                     | ((region >> 1) & self.not_last_column)
+                     | (region << width)
+                     | (region >> width)) & free
+            if grown == region:
+                break
+            region = grown
+
+        result = (region, bin(region).count('1'))
+        self.regions.append(result)
+        return result
+
+    def region_size(self, position):
+        """Number of free cells reachable from position"""
+        return self.region(position)[1]
+
+    def is_safe(self, position, length):
+        """True if moving to position leaves room for a snake of the given length.
+        The region is only grown until it holds length cells, which for a short
+        snake takes a few steps instead of a fill of the whole board."""
+        bit = self.bit(position) & self.free
+        if not bit:
+            return length <= 0
+
+        for region, size in self.regions:
+            if region & bit:
+                return size >= length
+        for region, size in self.partial:
+            if region & bit and size >= length:
+                return True  # Part of the same region is already big enough
+
+        free = self.free
+        width = self.width
+        region = bit
+        while True:
+            size = bin(region).count('1')
+            if size >= length:
+                self.partial.append((region, size))
+                return True
+            grown = (region
+                     | ((region << 1) & self.not_first_column)
+                     | ((region >> 1) & self.not_last_column)
+                     | (region << width)
+                     | (region >> width)) & free
+            if grown == region:
+                self.regions.append((region, size))  # The whole region, and too small
+                return False
+            region = grown
@@ -0,0 +1,203 @@
+import mmap
+import struct
+from environment_constants import *
+
+# File layout:
+#   header | record * total_turns | index entry * n_games | footer
+# Every record has the same size, so turn t of game g lives at
+#   HEADER.size + (index[g].first_record + t) * record_size
+# The index and footer are written by close(). Without them (the writer
+# crashed) the index is rebuilt from the records: every game starts with
+# a turn 0 record.
+MAGIC = b'SNKRPLY1'
+HEADER = struct.Struct('<8sHHI')          # magic, grid width, grid height, record size
+INDEX_ENTRY = struct.Struct('<QIb3x')     # first record, number of turns, winner id
+FOOTER = struct.Struct('<QI8s')           # index offset, number of games, magic
+
+# Per-turn record header:
+# turn, score1, score2, len1, len2, dir1 x/y, dir2 x/y, normal/super/trap counts, winner id (-1 while running)
+TURN_HEADER = struct.Struct('<HhhHHbbbbBBBb')
+TURN_FIELDS = 13
+
+MAX_BODY = GRID_WIDTH * GRID_HEIGHT + 1  # +1 for a head that left the grid
+MAX_FOOD = FOOD_AMOUNT
+MAX_TRAPS = SPIKE_TRAPS_AMOUNT
+
+
+def record_struct(max_body=MAX_BODY):
+    """Struct for one fixed-size turn record (positions stored as signed x, y bytes)"""
+    cells = 2 * max_body + 2 * MAX_FOOD + MAX_TRAPS
+    return struct.Struct(TURN_HEADER.format + f'{2 * cells}b')
+
+
+class ReplayState:
+    """State of one turn loaded from a replay archive"""
+
+    def __init__(self, turn, scores, bodies, directions, normal_food, super_food, traps, winner):
+        self.turn = turn
+        self.scores = scores
+        self.bodies = bodies
+        self.directions = directions
+        self.normal_food = normal_food
+        self.super_food = super_food
+        self.traps = traps
+        self.winner = winner  # None while running, 0 for a tie, else 1 or 2
+
+    @property
+    def game_over(self):
+        return self.winner is not None
+
+
+class ReplayWriter:
+    """Append games turn by turn to a replay archive"""
+
+    def __init__(self, path):
+        self.path = path
+        self.record = record_struct()
+        self.file = open(path, 'wb')
+        self.file.write(HEADER.pack(MAGIC, GRID_WIDTH, GRID_HEIGHT, self.record.size))
+
+        self.index = []  # [first record, turns, winner] per game
+        self.total_records = 0
+
+    def new_game(self):
+        """Start a new game, returns its index in the archive"""
+        self.file.flush()  # Finished games reach the file even if close() is never called
+        self.index.append([self.total_records, 0, -1])
+        return len(self.index) - 1
+
+    def record_turn(self, game):
+        """Append the current state of a Game (archives hold two-snake games)"""
+        if len(game.snakes) != 2:
+            raise ValueError(f"Replay archives store two snakes, the game has {len(game.snakes)}")
+        snake1, snake2 = game.snake1, game.snake2
+        food_manager = game.food_manager
+        winner = game.snake_id(game.winner) if game.game_over else -1
+
+        cells = []
+        for body in (snake1.body, snake2.body):
+            cells.extend(body)
+            cells.extend([(0, 0)] * (MAX_BODY - len(body)))
+        for items, size in ((food_manager.normal_food_items, MAX_FOOD),
+                            (food_manager.super_food_items, MAX_FOOD),
+                            (food_manager.spike_trap_items, MAX_TRAPS)):
+            cells.extend(item.position for item in items)
+            cells.extend([(0, 0)] * (size - len(items)))
+
+        flat = [value for cell in cells for value in cell]
+        self.file.write(self.record.pack(
+            game.turn_count, snake1.score, snake2.score,
+            len(snake1.body), len(snake2.body),
+            snake1.direction[0], snake1.direction[1],
+            snake2.direction[0], snake2.direction[1],
+            len(food_manager.normal_food_items),
+            len(food_manager.super_food_items),
+            len(food_manager.spike_trap_items),
+            winner, *flat))
+
+        self.total_records += 1
+        entry = self.index[-1]
+        entry[1] += 1
+        entry[2] = winner
+
+    def close(self):
+        """Write the game index and footer"""
+        if self.file.closed:
+            return
+        index_offset = self.file.tell()
+        for first, turns, winner in self.index:
+            self.file.write(INDEX_ENTRY.pack(first, turns, winner))
+        self.file.write(FOOTER.pack(index_offset, len(self.index), MAGIC))
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ReplayArchive:
+    """Random access reader for replay archives backed by mmap"""
+
+    def __init__(self, path):
+        self.file = open(path, 'rb')
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self.width, self.height, record_size = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a replay archive")
+
+        self.max_body = self.width * self.height + 1
+        self.record = record_struct(self.max_body)
+        if self.record.size != record_size:
+            raise ValueError(f"{path} was written with different item settings")
+
+        self.index_offset, self.n_games, end_magic = FOOTER.unpack_from(self.map, len(self.map) - FOOTER.size)
+        self.index = None
+        if end_magic != MAGIC:
+            self.index = self.scan_index()  # Not closed properly
+            self.n_games = len(self.index)
+
+    def scan_index(self):
+        """Rebuild the game index from the record headers, a partly written
+        last record is dropped"""
+        index = []
+        for record in range((len(self.map) - HEADER.size) // self.record.size):
+            fields = TURN_HEADER.unpack_from(self.map, HEADER.size + record * self.record.size)
+            if fields[0] == 0 or not index:
+                index.append([record, 0, -1])
+            index[-1][1] += 1
+            index[-1][2] = fields[-1]
+        return [tuple(entry) for entry in index]
+
+    def __len__(self):
+        return self.n_games
+
+    def game_info(self, game):
+        """Return (first record, number of turns, winner id) of a game"""
+        if not 0 <= game < self.n_games:
+            raise IndexError(f"game {game} out of range")
+        if self.index is not None:
+            return self.index[game]
+        return INDEX_ENTRY.unpack_from(self.map, self.index_offset + game * INDEX_ENTRY.size)
+
+    def game_length(self, game):
+        """Number of recorded turns of a game"""
+        return self.game_info(game)[1]
+
+    def load_turn(self, game, turn):
+        """Load a single turn without touching the rest of the file"""
+        first, turns, _ = self.game_info(game)
+        if not 0 <= turn < turns:
+            raise IndexError(f"turn {turn} out of range for game {game}")
+
+        values = self.record.unpack_from(self.map, HEADER.size + (first + turn) * self.record.size)
+        (turn_count, score1, score2, len1, len2, dx1, dy1, dx2, dy2,
+         n_normal, n_super, n_traps, winner) = values[:TURN_FIELDS]
+
+        def cells(start, count):
+            start = TURN_FIELDS + 2 * start
+            flat = values[start:start + 2 * count]
+            return list(zip(flat[0::2], flat[1::2]))
+
+        items = 2 * self.max_body
+        body1 = cells(0, len1)
+        body2 = cells(self.max_body, len2)
+        normal_food = cells(items, n_normal)
+        super_food = cells(items + MAX_FOOD, n_super)
+        traps = cells(items + 2 * MAX_FOOD, n_traps)
+
+        return ReplayState(turn_count, (score1, score2), (body1, body2),
+                           ((dx1, dy1), (dx2, dy2)), normal_food, super_food, traps,
+                           None if winner < 0 else winner)
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
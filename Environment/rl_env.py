@@ -0,0 +1,122 @@
+import random
+import numpy as np
+from environment_constants import *
+from cells import DIRECTIONS
+from game_logic import Game
+
+# Observation planes
+PLANE_OWN_BODY = 0
+PLANE_OPPONENT = 1      # Opponent segments within VISIBILITY_RANGE of the head
+PLANE_NORMAL_FOOD = 2
+PLANE_SUPER_FOOD = 3
+PLANE_TRAPS = 4
+NUM_PLANES = 5
+
+# Rewards, in units of NORMAL_FOOD_REWARD
+ITEM_REWARDS = {
+    'normal': NORMAL_FOOD_REWARD,
+    'super': SUPER_FOOD_REWARD,
+    'trap': -SPIKE_TRAP_COST,
+}
+WIN_REWARD = SPIKE_TRAP_COST
+LOSS_REWARD = -SPIKE_TRAP_COST
+
+
+class SnakeEnv:
+    """
+    Gymnasium-style reset/step environment. The learner controls the blue
+    snake against a registered agent. Actions index DIRECTIONS (UP, DOWN,
+    LEFT, RIGHT). Observations are a (NUM_PLANES, height, width) array that
+    is preallocated once and refilled in place every step, so copy it if it
+    must outlive the next step.
+    """
+
+    def __init__(self, opponent=DEFAULT_AGENT2, max_turns=MAX_TURNS, dtype=np.float32):
+        self.opponent = opponent
+        self.max_turns = max_turns
+        self.width = GRID_WIDTH
+        self.height = GRID_HEIGHT
+        self.n_actions = len(DIRECTIONS)
+
+        self.observation = np.zeros((NUM_PLANES, self.height, self.width), dtype=dtype)
+        self.planes = self.observation.reshape(NUM_PLANES, -1)  # Flat view over the same memory
+        self.reward_scale = 1.0 / NORMAL_FOOD_REWARD
+        self.game = None
+
+    def reset(self, seed=None):
+        """Start a new game, returns (observation, info)"""
+        if seed is not None:
+            random.seed(seed)
+        self.game = Game(headless=True, agent1=None, agent2=self.opponent)
+        return self.encode(), self.info()
+
+    def step(self, action):
+        """Move the learner, let the opponent move and return
+        (observation, reward, terminated, truncated, info)"""
+        game = self.game
+        if game.game_over or game.turn_count >= self.max_turns:
+            raise RuntimeError("The episode is over, call reset() before stepping again")
+        # On the MAX_TURNS tick update() only scores the game and nobody moves,
+        # so the learner does not either: its move would never be checked for collisions
+        horizon = game.turn_count + 1 >= MAX_TURNS
+        if not horizon:
+            game.snake1.update_move(DIRECTIONS[action])
+        game.update()
+
+        reward = 0
+        for snake, item_type, _, _ in game.last_collected:
+            if snake is game.snake1:
+                reward += ITEM_REWARDS[item_type]
+
+        # A game decided by play (collisions, scores) is terminal even on the
+        # last turn; running out of turns is a time limit, not a terminal state
+        terminated = game.game_over and not horizon
+        truncated = not terminated and game.turn_count >= self.max_turns
+
+        if game.game_over:
+            if game.winner is game.snake1:
+                reward += WIN_REWARD
+            elif game.winner is game.snake2:
+                reward += LOSS_REWARD
+
+        return self.encode(), reward * self.reward_scale, terminated, truncated, self.info()
+
+    def encode(self):
+        """Fill the observation planes in place"""
+        planes = self.planes
+        planes.fill(0)
+        game = self.game
+        width = self.width
+
+        own = planes[PLANE_OWN_BODY]
+        for x, y in game.snake1.body:
+            if 0 <= x < width and 0 <= y < self.height:
+                own[y * width + x] = 1
+
+        # Only what the blue snake can see of the opponent
+        head_x, head_y = game.snake1.body[0]
+        opponent = planes[PLANE_OPPONENT]
+        for x, y in game.snake2.body:
+            if abs(x - head_x) <= VISIBILITY_RANGE and abs(y - head_y) <= VISIBILITY_RANGE:
+                if 0 <= x < width and 0 <= y < self.height:
+                    opponent[y * width + x] = 1
+
+        food_manager = game.food_manager
+        for plane, items in ((PLANE_NORMAL_FOOD, food_manager.normal_food_items),
+                             (PLANE_SUPER_FOOD, food_manager.super_food_items),
+                             (PLANE_TRAPS, food_manager.spike_trap_items)):
+            row = planes[plane]
+            for item in items:
+                x, y = item.position
+                row[y * width + x] = 1
+
+        return self.observation
+
+    def info(self):
+        """Scores and turn of the current game"""
+        game = self.game
+        return {
+            'turn': game.turn_count,
+            'scores': (game.snake1.score, game.snake2.score),
+            'winner': game.snake_id(game.winner) if game.game_over else None,
+        }
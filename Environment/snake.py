@@ -1,5 +1,5 @@
-import pygame
 from environment_constants import *
+from cells import DIRECTIONS, FORWARD_DIRECTIONS
 
 
 class Snake:
@@ -11,10 +11,19 @@ class Snake:
         self.score = 0
         self.segments_to_add = 0 # to add new segment
         self.decision_time = 0
+        self.last_decision_time = 0  # ns of the latest decision
+        self.alive = True  # False once eliminated from a game with more snakes
+        self.deferred = False  # While True, moves are held in next_move (simultaneous turns)
+        self.next_move = None
+        self.visible = []  # Reused result list of radar()
+        # Changes since Game.update last reset them, read by diffs.TickDiff
+        self.heads_added = 0
+        self.tails_removed = 0
 
     def timer(self, time):
         """Set the time for decision making"""
         self.decision_time += time
+        self.last_decision_time = time
 
     def get_total_time(self):
         """Get the total time for decision making"""
@@ -27,20 +36,18 @@ class Snake:
 
 
     def get_available_dire(self, current_direction): 
-        """Give available direction"""
-        directions = [(0,-1),(0,1),(-1,0),(1,0)]
-        available_directions = []
-        current_x, current_y = current_direction
-
-        for direction in directions:
-            x, y = direction
-            if not ((x == -current_x and y == -current_y) and len(self.body) != 1):
-                available_directions.append(direction)
-
-        return available_directions
+        """Give available direction (shared tuples, do not modify)"""
+        # A one-cell snake may reverse, longer snakes may not
+        if len(self.body) == 1:
+            return DIRECTIONS
+        return FORWARD_DIRECTIONS[current_direction]
 
     def update_move(self, movement):
         """Update the snake's position"""
+        if self.deferred:
+            self.next_move = movement
+            return
+
         # Get the current head position
         head_x, head_y = self.body[0]
 
@@ -51,6 +58,7 @@ class Snake:
 
         # Insert new head at the beginning of the body
         self.body.insert(0, new_head)
+        self.heads_added += 1
 
         # Add segments if needed
         if self.segments_to_add > 0:
@@ -58,6 +66,19 @@ class Snake:
         else:
             # Remove the tail if no segments to add
             self.body.pop()
+            self.tails_removed += 1
+
+    def apply_deferred_move(self):
+        """Stop deferring and make the move held back while deferred"""
+        self.deferred = False
+        if self.next_move is not None:
+            movement, self.next_move = self.next_move, None
+            self.update_move(movement)
+
+    def reset_changes(self):
+        """Start counting the changes of a new tick"""
+        self.heads_added = 0
+        self.tails_removed = 0
 
     def grow(self, amount=1):
         """Add segments to the snake"""
@@ -67,6 +88,7 @@ class Snake:
         """Reduce the snake's length (for spike trap)"""
         if len(self.body) > 1:
             self.body.pop()  # Remove the tail
+            self.tails_removed += 1
             return True
 
         return False # this will be used to end the game
@@ -75,15 +97,25 @@ class Snake:
         """Get the position of the snake's head"""
         return self.body[0]
 
-    def check_self_collision(self):
-        """Check if the snake has collided with itself"""
-        head = self.body[0]
-        return head in self.body[1:]
+    def occupies(self, position):
+        """Whether position is a body cell the snake still covers after its
+        next move, i.e. any cell but the tail (without slicing the body)"""
+        body = self.body
+        return position in body and body.index(position) < len(body) - 1
+
+    def sees(self, opponent, position):
+        """Whether position is an opponent segment within visibility range,
+        the same as position in radar(opponent) without building the list"""
+        head_x, head_y = self.body[0]
+        return (abs(position[0] - head_x) <= VISIBILITY_RANGE and abs(position[1] - head_y) <= VISIBILITY_RANGE
+                and position in opponent.body)
 
     def radar(self, opponent):
-        """Check if this snake can see the opponent within visibility range"""
+        """Check if this snake can see the opponent within visibility range.
+        Returns the visible segments in a list reused by the next call."""
         head_x, head_y = self.body[0]
-        visible_segments = []
+        visible_segments = self.visible
+        visible_segments.clear()
 
         # Check each opponent segment
         for segment in opponent.body:
@@ -98,6 +130,8 @@ class Snake:
 #--------------------------------------------------------------
     def draw(self, screen):
         """Draw the snake on the screen"""
+        import pygame  # Only needed for drawing, logic-only runs never load it
+
         for segment in self.body:
             rect = pygame.Rect(
                 segment[0] * CELL_SIZE,
@@ -156,3 +190,30 @@ class Snake:
             # Draw pupils
             pygame.draw.circle(screen, (0, 0, 0), (left_eye_x, left_eye_y), eye_radius // 2)
             pygame.draw.circle(screen, (0, 0, 0), (right_eye_x, right_eye_y), eye_radius // 2)
+
+
+class Rivals:
+    """
+    Every other snake still in a game of more than two, seen by an agent as
+    one opponent: body iterates over and tests the cells of all of them.
+    Agents only read opponent.body, so they avoid every snake unchanged.
+    """
+
+    def __init__(self, snake, snakes):
+        self.snake = snake
+        self.snakes = snakes
+
+    @property
+    def body(self):
+        return self  # Iterable and supports `in`, like a body list
+
+    def __iter__(self):
+        for other in self.snakes:
+            if other is not self.snake and other.alive:
+                yield from other.body
+
+    def __contains__(self, position):
+        for other in self.snakes:
+            if other is not self.snake and other.alive and position in other.body:
+                return True
+        return False
@@ -1,6 +1,16 @@
 import heapq
 from collections import defaultdict
 from environment_constants import *
+from reachability import ReachabilityMap
+from cells import DIRECTIONS
+from cache import LRUCache
+
+# Key of the values dict holding the cost of stepping on each item kind
+ITEM_COSTS = {
+    'trap': 'trap_cost',
+    'normal': 'normal_food_cost',
+    'super': 'super_food_cost',
+}
 
 class SnakeAI:
     """
@@ -8,7 +18,7 @@ class SnakeAI:
     This agent uses A* search to find optimal paths to food while avoiding obstacles.
     """
     
-    def __init__(self, snake, opponent, grid, food_manager):
+    def __init__(self, snake, opponent, grid, food_manager, time_aware=False, values=None, book=None):
         self.snake = snake
         self.opponent = opponent
         self.grid = grid
@@ -23,7 +33,13 @@ class SnakeAI:
             'super_food_cost': SUPER_FOOD_COST,    # Cost of super food
             'normal_move_cost': SAVE_MOVE_COST,    # Normal move cost
             'trap_cost': SPIKE_TRAP_COST,           # Trap cost
+
+            'distance_weight': DISTANCE_WEIGHT,              # Score lost per cell of distance to food
+            'opponent_penalty': OPPONENT_PROXIMITY_PENALTY,  # Heuristic penalty near the opponent
+            'trap_penalty': TRAP_PROXIMITY_PENALTY,          # Heuristic penalty near traps
         }
+        if values:
+            self.values.update(values)  # Overrides, e.g. from tuning.py
         
         # Available directions
         self.directions = {
@@ -32,18 +48,46 @@ class SnakeAI:
             'LEFT': LEFT,
             'RIGHT': RIGHT
         }
+
+        # Time-aware mode: body cells become passable once the tail has left them
+        self.time_aware = time_aware
+        self.release_steps = {}
+
+        # Cached plan, kept between ticks and repaired when it gets blocked
+        self.path = None            # planned cells, path[self.path_index] is the head
+        self.path_index = 0
+        self.path_tail = None       # tail cell when the plan was made
+        self.food_version = None    # food_manager.version when the plan was made
+
+        # Heuristic penalties around traps, keyed by food_manager.version
+        self.trap_penalty_cache = LRUCache('astar.trap_penalties', AGENT_CACHE_SIZE)
+
+        # Opening book consulted before searching (True for the default book file)
+        self.book = None
+        if book:
+            from opening_book import DEFAULT_BOOK, load_book
+            self.book = load_book(DEFAULT_BOOK if book is True else book)
     
     def make_move(self):
         """Calculate the best move using A* and update the snake's direction"""
+        # Play the book move while the position was solved offline (see opening_book.py)
+        if self.book is not None:
+            direction = self.book.probe(self.snake, self.opponent, self.food_manager, self.grid)
+            if direction is not None:
+                self.snake.update_move(direction)
+                return
+
         # Get current snake head position
         head_pos = self.snake.get_head_position()
-        
-        # Find best target (food item)
-        target = self.find_best_target()
-        
 
-        # Find path to target using A*
-        path = self.a_star_search(head_pos, target)
+        # Reuse the cached path when possible, otherwise search again
+        path = self.plan_path(head_pos)
+
+        # Drop the plan if its first step leads into a pocket smaller than the snake
+        reachability = ReachabilityMap.for_snake(self.snake, self.opponent, self.grid)
+        if path and len(path) > 1 and not reachability.is_safe(path[1], len(self.snake.body)):
+            path = None
+            self.path = None
         
         if path and len(path) > 1:
             # Get the first move in the path
@@ -57,10 +101,90 @@ class SnakeAI:
             # Update snake direction
             self.snake.update_move(direction)
         else:
-            # No valid path found, keep current direction
-            self.snake.update_move(self.snake.direction)
+            # No valid path found, move towards the most free space
+            self.snake.update_move(self.safest_direction(head_pos, reachability))
+
+    def safest_direction(self, head_pos, reachability):
+        """Valid direction with the largest reachable region, keeping the current direction on ties"""
+        best_direction = self.snake.direction
+        best_size = 0
+        for direction in self.snake.get_available_dire(self.snake.direction):
+            next_pos = (head_pos[0] + direction[0], head_pos[1] + direction[1])
+            if not self.is_valid_move(next_pos):
+                continue
+            size = reachability.region_size(next_pos)
+            if size > best_size or (size == best_size and direction == self.snake.direction):
+                best_direction = direction
+                best_size = size
+        return best_direction
 
     
+    def plan_path(self, head_pos):
+        """Return the remaining planned path from the head, replanning only when needed"""
+        cached = (self.path is not None
+                  and self.food_version == self.food_manager.version
+                  and self.path_index < len(self.path)
+                  and self.path[self.path_index] == head_pos)
+        if not cached:
+            return self.replan(head_pos)
+
+        path = self.path[self.path_index:]
+        blocked = self.blocked_path_indices(path)
+        if blocked:
+            path = self.repair_path(path, blocked)
+            if path is None:
+                return self.replan(head_pos)
+            self.path, self.path_index = path, 0
+
+        self.path_index += 1  # The head will be on the next cell after this move
+        return path
+
+    def replan(self, head_pos):
+        """Pick a target and run a full A* search"""
+        # Find best target (food item)
+        target = self.find_best_target()
+
+        # Find path to target using A*
+        path = self.a_star_search(head_pos, target)
+
+        self.path = path
+        self.path_index = 1
+        self.path_tail = self.snake.body[-1]
+        self.food_version = self.food_manager.version
+        return path
+
+    def blocked_path_indices(self, path):
+        """Indices of planned cells that became obstacles since the plan was made.
+        Only cells that can change between ticks are checked: visible opponent
+        segments and the old tail (still there if the snake grew)."""
+        index = {cell: i for i, cell in enumerate(path)}
+        changed = set(self.snake.radar(self.opponent))
+        if not self.time_aware and self.snake.occupies(self.path_tail):
+            changed.add(self.path_tail)
+
+        return sorted(index[cell] for cell in changed if index.get(cell, 0) > 0)
+
+    def repair_path(self, path, blocked):
+        """Route around blocked cells with a local A* search between the free
+        cells before and after them. Returns None if a full search is needed."""
+        first = blocked[0]
+        last = first
+        while last + 1 < len(path) and last + 1 in blocked:
+            last += 1
+        if last + 1 >= len(path):
+            return None  # The target itself is blocked
+
+        detour = self.a_star_search(path[first - 1], path[last + 1], start_step=first - 1)
+        if not detour:
+            return None
+
+        repaired = path[:first - 1] + detour + path[last + 2:]
+        if len(set(repaired)) != len(repaired):
+            return None  # The detour crosses the rest of the path
+        if len(blocked) > last - first + 1 and self.blocked_path_indices(repaired):
+            return None  # More blocked sections further along
+        return repaired
+
     def find_best_target(self):
         """Find the best food target based on value and distance"""
         head_pos = self.snake.get_head_position()
@@ -68,27 +192,28 @@ class SnakeAI:
         best_value = float('-inf')
         
         # Check normal food items
-        for food_pos, _ in self.food_manager.normal_food_items:
-            distance = self.manhattan_distance(head_pos, food_pos)
-            value = self.values['normal_food_reward'] - (distance * 5)  # Value decreases with distance
+        for item in self.food_manager.normal_food_items:
+            distance = self.grid.tables.distance(head_pos, item.position)
+            value = self.values['normal_food_reward'] - (distance * self.values['distance_weight'])  # Value decreases with distance
             
             if value > best_value:
                 best_value = value
-                best_target = food_pos
+                best_target = item.position
         
         # Check super food items (higher value)
-        for food_pos, _ in self.food_manager.super_food_items:
-            distance = self.manhattan_distance(head_pos, food_pos)
-            value = self.values['super_food_reward'] - (distance * 5)
+        for item in self.food_manager.super_food_items:
+            distance = self.grid.tables.distance(head_pos, item.position)
+            value = self.values['super_food_reward'] - (distance * self.values['distance_weight'])
             
             if value > best_value:
                 best_value = value
-                best_target = food_pos
+                best_target = item.position
         
         return best_target
     
-    def a_star_search(self, head_pos, goal):
-        """A* search algorithm to find path from start to goal"""
+    def a_star_search(self, head_pos, goal, start_step=0):
+        """A* search algorithm to find path from start to goal.
+        start_step is the number of moves already planned before head_pos."""
         # Priority queue for open set, format: (f_score, position)
         open_set = []
         heapq.heappush(open_set, (0, head_pos)) # It is an efficient priority queue implementation
@@ -100,15 +225,26 @@ class SnakeAI:
         actual_score = defaultdict(lambda: float('inf'))
         actual_score[head_pos] = 0
         
+        # Heuristic penalties are the same for the whole search
+        penalties = self.penalty_field()
+
         f_score = defaultdict(lambda: float('inf'))
-        f_score[head_pos] = self.heuristic(head_pos, goal)
+        f_score[head_pos] = self.heuristic(head_pos, goal, penalties)
         
+        # Moves needed to reach each position (used by the time-aware mode)
+        steps = {head_pos: start_step}
+        if self.time_aware:
+            self.release_steps = self.body_release_steps()
+
         # To prevent infinite loops
         closed_set = set()
+        open_positions = {head_pos}
+        neighbours = self.grid.tables.neighbours
         
         while open_set:
             # Get position with lowest f_score
             _, current = heapq.heappop(open_set)
+            open_positions.discard(current)
             
             # If we reached the goal
             if current == goal:
@@ -121,12 +257,13 @@ class SnakeAI:
             # Get available moves from current position
             available_dirs = self.get_available_directions(current)
             
-            for direction in available_dirs:
-                # Calculate neighbor position
-                neighbor = (current[0] + direction[0], current[1] + direction[1])
+            # Precomputed neighbours, moves off the grid are already removed
+            for direction, neighbor in neighbours.get(current, ()):
+                if direction not in available_dirs:
+                    continue
                 
                 # Skip if in closed set or invalid
-                if neighbor in closed_set or not self.is_valid_move(neighbor):
+                if neighbor in closed_set or not self.is_valid_move(neighbor, steps[current] + 1):
                     continue
                 
                 # Calculate tentative actual_score
@@ -136,12 +273,14 @@ class SnakeAI:
                 if tentative_actual_score < actual_score[neighbor]:
                     # Record this path
                     came_from[neighbor] = current
+                    steps[neighbor] = steps[current] + 1
                     actual_score[neighbor] = tentative_actual_score
-                    f_score[neighbor] = tentative_actual_score + self.heuristic(neighbor, goal)
+                    f_score[neighbor] = tentative_actual_score + self.heuristic(neighbor, goal, penalties)
                     
                     # Add to open set if not already there
-                    if neighbor not in [pos for _, pos in open_set]:
+                    if neighbor not in open_positions:
                         heapq.heappush(open_set, (f_score[neighbor], neighbor))
+                        open_positions.add(neighbor)
         
         return None  # No path found
     
@@ -152,67 +291,85 @@ class SnakeAI:
             return self.snake.get_available_dire(self.snake.direction)
         
         # Otherwise return all four directions
-        return [(0, -1), (0, 1), (-1, 0), (1, 0)]  # UP, DOWN, LEFT, RIGHT
+        return DIRECTIONS  # UP, DOWN, LEFT, RIGHT
     
-    def is_valid_move(self, position):
-        """Check if a move is valid (not a collision)"""
+    def body_release_steps(self):
+        """Number of moves after which each body cell is free again.
+        Segment i (0 is the head) of an n long snake is left behind after
+        n - i moves, plus one move for every segment still to be added."""
+        length = len(self.snake.body)
+        growth = self.snake.segments_to_add
+        return {cell: length - i + growth for i, cell in enumerate(self.snake.body)}
+
+    def is_valid_move(self, position, step=None):
+        """Check if a move is valid (not a collision).
+        step is the move number at which the position is entered (time-aware mode)."""
         # Check grid boundaries
         if not self.grid.is_valid_position(position):
             return False
         
+        if self.time_aware and step is not None:
+            # Own body blocks only until the tail has moved past it
+            if self.release_steps.get(position, 0) > step:
+                return False
         # Check collision with own body (except tail which will move)
-        if position in self.snake.body[:-1]:
+        elif self.snake.occupies(position):
             return False
         
         # Check collision with opponent
-        if position in self.snake.radar(self.opponent):
+        if self.snake.sees(self.opponent, position):
             return False
         
         return True
     
     def move_cost(self, position):
         """Calculate the cost/reward of moving to a position"""
-        # Check for traps (penalty)
-        for trap_pos, _ in self.food_manager.spike_trap_items:
-            if position == trap_pos:
-                return self.values['trap_cost']
-        
-        # Check for normal food (reward)
-        for food_pos, _ in self.food_manager.normal_food_items:
-            if position == food_pos:
-                return self.values['normal_food_cost']  # Negative because A* minimizes cost
-        
-        # Check for super food (higher reward)
-        for food_pos, _ in self.food_manager.super_food_items:
-            if position == food_pos:
-                return self.values['super_food_cost']  # Negative because A* minimizes cost
+        # Traps are a penalty, food is cheaper than a normal move
+        item = self.food_manager.item_at(position)
+        if item is not None:
+            return self.values[ITEM_COSTS[item.kind]]
         
         # Normal move
         return self.values['normal_move_cost']  # Small reward for each step
     
-    def heuristic(self, a, b):
+    def heuristic(self, a, b, penalties=None):
         """Heuristic function for A* (Manhattan distance + penalties)"""
-        # Base heuristic: Manhattan distance
-        base_h = self.manhattan_distance(a, b)
+        # Base heuristic: Manhattan distance from the shared distance table
+        base_h = self.grid.tables.distances_to(b).get(a)
+        if base_h is None:
+            base_h = self.manhattan_distance(a, b)
         
         # Add penalties for dangerous areas
-        penalty = 0
+        if penalties is None:
+            penalties = self.penalty_field()
         
+        return base_h + penalties.get(a, 0)
+
+    def penalty_field(self):
+        """Heuristic penalty of every cell close (distance <= 2) to a visible
+        opponent segment or a trap. Cells not in the dict have no penalty."""
+        # Penalty for being near traps, only rebuilt when the items change
+        trap_field = self.trap_penalty_cache.get_or_compute(self.food_manager.version, self.trap_penalties)
+
         # Penalty for being near opponent snake
         visible_segments = self.snake.radar(self.opponent)
+        if not visible_segments:
+            return trap_field
+
+        field = dict(trap_field)
         for segment in visible_segments:
-            dist = self.manhattan_distance(a, segment)
-            if dist <= 2:  # Close to opponent
-                penalty += (3 - dist) * 10
-        
-        # Penalty for being near traps
-        for trap_pos, _ in self.food_manager.spike_trap_items:
-            dist = self.manhattan_distance(a, trap_pos)
-            if dist <= 2:  # Close to trap
-                penalty += (3 - dist) * 3
-        
-        return base_h + penalty
+            for cell, dist in self.grid.tables.cells_within(segment, 2).items():
+                field[cell] = field.get(cell, 0) + (3 - dist) * self.values['opponent_penalty']
+        return field
     
+    def trap_penalties(self):
+        """Heuristic penalty of the cells close to a trap"""
+        field = {}
+        for trap in self.food_manager.spike_trap_items:
+            for cell, dist in self.grid.tables.cells_within(trap.position, 2).items():
+                field[cell] = field.get(cell, 0) + (3 - dist) * self.values['trap_penalty']
+        return field
+
     def manhattan_distance(self, pos1, pos2):
         """Calculate Manhattan distance between two positions"""
         return abs(pos1[0] - pos2[0]) + abs(pos1[1] - pos2[1])
@@ -1,14 +1,32 @@
 import random
+import time
 import numpy as np
 from environment_constants import *
+from reachability import ReachabilityMap
+from cells import DIRECTIONS
+from cache import LRUCache
+
+# Local search strategies selectable with the strategy argument
+STRATEGIES = ('greedy', 'beam', 'hill_climb', 'annealing')
+
 
 class SnakeLocalSearch:
     """
     Snake AI using a local search algorithm that evaluates nearby positions
     and selects the best one based on various factors.
+
+    Besides the greedy one-step search, move sequences of `lookahead` moves can
+    be optimised with beam search, hill climbing with random restarts or
+    simulated annealing, bounded by `max_iterations` and `time_budget_ms`.
     """
     
-    def __init__(self, snake, opponent, grid, food_manager):
+    def __init__(self, snake, opponent, grid, food_manager, strategy=LOCAL_SEARCH_STRATEGY,
+                 lookahead=LOCAL_SEARCH_LOOKAHEAD, beam_width=LOCAL_SEARCH_BEAM_WIDTH,
+                 max_iterations=LOCAL_SEARCH_MAX_ITERATIONS, time_budget_ms=LOCAL_SEARCH_TIME_BUDGET_MS,
+                 values=None, book=None):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown local search strategy {strategy!r}, expected one of {STRATEGIES}")
+
         self.snake = snake
         self.opponent = opponent
         self.grid = grid
@@ -23,10 +41,42 @@ class SnakeLocalSearch:
             'super_food_cost': SUPER_FOOD_COST,    # Cost of super food
             'normal_move_cost': SAVE_MOVE_COST,    # Normal move cost
             'trap_cost': SPIKE_TRAP_COST,           # Trap cost
+
+            'distance_weight': DISTANCE_WEIGHT,              # Score lost per cell of distance to food
         }
+        if values:
+            self.values.update(values)  # Overrides, e.g. from tuning.py
+
+        # Sequence search settings (only used by the non-greedy strategies)
+        self.strategy = strategy
+        self.lookahead = lookahead
+        self.beam_width = beam_width
+        self.max_iterations = max_iterations
+        self.time_budget = time_budget_ms / 1000
+        self.discount = LOCAL_SEARCH_DISCOUNT
+        self.start_temperature = LOCAL_SEARCH_START_TEMPERATURE
+        self.blocked = set()
+
+        # Food distance rows and traps keyed by food_manager.version, and sequence
+        # scores of the current move (cleared before every sequence search)
+        self.item_cache = LRUCache('local.item_tables', AGENT_CACHE_SIZE)
+        self.sequence_cache = LRUCache('local.sequences', SEQUENCE_CACHE_SIZE)
+
+        # Opening book consulted before searching (True for the default book file)
+        self.book = None
+        if book:
+            from opening_book import DEFAULT_BOOK, load_book
+            self.book = load_book(DEFAULT_BOOK if book is True else book)
     
     def make_move(self):
         """Calculate the best move using local search and update the snake direction"""
+        # Play the book move while the position was solved offline (see opening_book.py)
+        if self.book is not None:
+            direction = self.book.probe(self.snake, self.opponent, self.food_manager, self.grid)
+            if direction is not None:
+                self.snake.update_move(direction)
+                return
+
         # Get current snake head position
         head_pos = self.snake.get_head_position()
         
@@ -38,8 +88,8 @@ class SnakeLocalSearch:
             best_direction = self.snake.direction
             self.snake.update_move(best_direction)
         
-        # Evaluate each neighbor position
-        direction_scores = []
+        # Collect the neighbor positions
+        candidates = []
         for direction in available_directions:
             next_pos = (head_pos[0] + direction[0], head_pos[1] + direction[1])
             
@@ -47,9 +97,21 @@ class SnakeLocalSearch:
             if not self.is_valid_position(next_pos):
                 continue
             
-            # Calculate position score
-            score = self.evaluate_position(next_pos)
-            direction_scores.append((direction, score))
+            candidates.append((direction, next_pos))
+
+        # Score all candidates in one pass
+        scores = self.evaluate_positions([next_pos for _, next_pos in candidates])
+        if self.strategy != 'greedy' and self.lookahead > 1 and candidates:
+            scores = self.sequence_scores(candidates, scores)
+        direction_scores = [(direction, score) for (direction, _), score in zip(candidates, scores)]
+
+        # Prefer moves that do not lead into a pocket smaller than the snake
+        reachability = ReachabilityMap.for_snake(self.snake, self.opponent, self.grid)
+        length = len(self.snake.body)
+        safe_scores = [(direction, score) for direction, score in direction_scores
+                       if reachability.is_safe((head_pos[0] + direction[0], head_pos[1] + direction[1]), length)]
+        if safe_scores:
+            direction_scores = safe_scores
         # direction_names = {(0, -1): "UP", (0, 1): "DOWN", (-1, 0): "LEFT", (1, 0): "RIGHT"}
         # readable_scores = [(direction_names.get(direction, direction), score) for direction, score in direction_scores]
         # print("Direction scores:", readable_scores)
@@ -73,11 +135,11 @@ class SnakeLocalSearch:
             return False
         
         # Check collision with own body (except tail which will move)
-        if position in self.snake.body[:-1]:
+        if self.snake.occupies(position):
             return False
         
         # Check collision with opponent
-        if position in self.snake.radar(self.opponent):
+        if self.snake.sees(self.opponent, position):
             return False
         
         return True
@@ -85,40 +147,234 @@ class SnakeLocalSearch:
     def evaluate_position(self, position):
         """
         Evaluate a position based on multiple factors.
-        Returns a score value - higher is better.
+        Returns a score value - lower is better.
         """
+        return self.evaluate_positions([position])[0]
 
-        normal_food_items = [item[0] for item in self.food_manager.normal_food_items]
-        super_food_items = [item[0] for item in self.food_manager.super_food_items]
-        spike_trap_items = [item[0] for item in self.food_manager.spike_trap_items]
+    def item_tables(self):
+        """Distance rows of the food and the trap positions, rebuilt only when the items change"""
+        return self.item_cache.get_or_compute(self.food_manager.version, self.build_item_tables)
 
-        if position in spike_trap_items:
-            return self.values['trap_cost']
-        
-        elif position in super_food_items or position in normal_food_items:
-            return self.values['normal_food_cost']
-        
+    def build_item_tables(self):
+        """Shared distance row (see GridTables.distances_to) of every food, and the set of traps"""
+        tables = self.grid.tables
+        food = [tables.distances_to(item.position) for item in self.food_manager.normal_food_items]
+        food += [tables.distances_to(item.position) for item in self.food_manager.super_food_items]
+        traps = {item.position for item in self.food_manager.spike_trap_items}
+        return food, traps
+
+    def evaluate_positions(self, positions):
+        """
+        Score many positions at once. A trap costs trap_cost, otherwise the score
+        grows with the distance to the closest food (standing on food scores
+        normal_food_cost). Returns a list of scores - lower is better.
+        Positions must be on the grid; a decision scores a handful of them, so
+        plain lookups in the precomputed distance rows beat building arrays.
+        """
+        food, traps = self.item_tables()
+        weight = float(self.values['distance_weight'])  # based on 300/28.5 = 10.5263
+        cost = self.values['normal_food_cost']
+        trap_cost = float(self.values['trap_cost'])
+        scores = []
+        for position in positions:
+            if position in traps:
+                scores.append(trap_cost)
+            elif food:
+                closest = food[0][position]
+                for row in food:
+                    if row[position] < closest:
+                        closest = row[position]
+                scores.append(closest * weight + cost)
+            else:
+                scores.append(float('inf'))
+        return scores
+
+    def start_state(self):
+        """Search state of the real snake: (body tuple, segments still to add)"""
+        return tuple(self.snake.body), self.snake.segments_to_add
+
+    def apply_move(self, state, direction):
+        """Return the state after a move, or None if the move collides.
+        Works on plain tuples so the real Snake is never touched."""
+        body, growth = state
+        head_x, head_y = body[0]
+        next_pos = (head_x + direction[0], head_y + direction[1])
+
+        if not self.grid.is_valid_position(next_pos) or next_pos in self.blocked:
+            return None
+        if growth > 0:
+            if next_pos in body:
+                return None
+            return (next_pos,) + body, growth - 1
+        if next_pos in body and body.index(next_pos) < len(body) - 1:  # Any cell but the tail
+            return None
+        return (next_pos,) + body[:-1], 0
+
+    def evaluate_sequence(self, moves):
+        """Discounted score of a move sequence from the current state.
+        Moves after a collision pay trap_cost each."""
+        return self.sequence_cache.get_or_compute(tuple(moves), lambda: self.score_sequence(moves))
+
+    def score_sequence(self, moves):
+        """Roll out and score a move sequence (see evaluate_sequence)"""
+        state = self.start_state()
+        positions = []
+        for direction in moves:
+            state = self.apply_move(state, direction)
+            if state is None:
+                break
+            positions.append(state[0][0])
+
+        total = 0.0
+        for i, score in enumerate(self.evaluate_positions(positions)):
+            total += self.discount ** i * score
+        return total + (len(moves) - len(positions)) * self.values['trap_cost']
+
+    def random_sequence(self, first, greedy=False):
+        """Sequence of valid moves starting with the given direction.
+        Later moves are random, or the best one-step move if greedy is set."""
+        moves = [first]
+        state = self.apply_move(self.start_state(), first)
+        while state is not None and len(moves) < self.lookahead:
+            options = []
+            for direction in DIRECTIONS:
+                next_state = self.apply_move(state, direction)
+                if next_state is not None:
+                    options.append((direction, next_state))
+            if not options:
+                break
+            if greedy:
+                scores = self.evaluate_positions([next_state[0][0] for _, next_state in options])
+                direction, state = options[scores.index(min(scores))]
+            else:
+                direction, state = random.choice(options)
+            moves.append(direction)
+
+        # Pad dead ends so every sequence has the same length
+        while len(moves) < self.lookahead:
+            moves.append(moves[-1])
+        return moves
+
+    def neighbour_sequence(self, moves, first_moves):
+        """Copy of a sequence with one move changed"""
+        neighbour = list(moves)
+        i = random.randrange(len(neighbour))
+        options = first_moves if i == 0 else DIRECTIONS
+        options = [direction for direction in options if direction != neighbour[i]]
+        if options:
+            neighbour[i] = random.choice(options)
+        return neighbour
+
+    def sequence_scores(self, candidates, scores):
+        """
+        Optimise move sequences with the configured strategy and return the best
+        sequence score found for every candidate. Candidates never explored keep
+        their one-step score plus trap_cost for every remaining step.
+        """
+        self.blocked = set(self.snake.radar(self.opponent))
+        self.sequence_cache.clear()  # Scores depend on the current state
+        deadline = time.perf_counter() + self.time_budget
+
+        if self.strategy == 'beam':
+            best = self.beam_search(candidates, scores, deadline)
         else:
-            return self.food_score(position)
+            best = self.sequence_search(candidates, deadline)
 
-    
-    
-    def food_score(self, position):
-        """Calculate score based on food proximity and value"""
-        best_dist = float('inf')
-
-        for food_pos, _ in self.food_manager.normal_food_items:      
-            dist = self.manhattan_distance(position, food_pos)
-            if dist < best_dist:
-                best_dist = dist
-        for food_pos, _ in self.food_manager.super_food_items:
-            dist = self.manhattan_distance(position, food_pos)
-            if dist < best_dist:
-                best_dist = dist
-        
-        return (best_dist * 5) + self.values["normal_food_cost"] # based on 300/28.5 = 10.5263
-    
-    
-    def manhattan_distance(self, pos1, pos2):
-        """Calculate Manhattan distance between two positions"""
-        return abs(pos1[0] - pos2[0]) + abs(pos1[1] - pos2[1])
+        unexplored = (self.lookahead - 1) * self.values['trap_cost']
+        return [best.get(direction, score + unexplored) for (direction, _), score in zip(candidates, scores)]
+
+    def beam_search(self, candidates, scores, deadline):
+        """
+        Beam search over move sequences. The cells reached at each depth are
+        scored in one vectorised call and the beam_width best sequences are kept.
+        Returns {first direction: best score}.
+        """
+        start = self.start_state()
+        beam = []
+        for (direction, _), score in zip(candidates, scores):
+            state = self.apply_move(start, direction)
+            if state is not None:
+                beam.append((score, direction, state))
+        best = {direction: (1, score) for score, direction, _ in beam}  # direction -> (depth, score)
+        reached = 1
+
+        for depth in range(1, self.lookahead):
+            if time.perf_counter() > deadline:
+                break
+
+            # Expand every sequence by one valid move
+            expansions = []
+            for total, first, state in beam:
+                for direction in DIRECTIONS:
+                    next_state = self.apply_move(state, direction)
+                    if next_state is not None:
+                        expansions.append((total, first, next_state))
+            if not expansions:
+                break
+
+            # Score the new heads of all sequences in one call and keep the best ones
+            step_scores = self.evaluate_positions([state[0][0] for _, _, state in expansions])
+            discount = self.discount ** depth
+            beam = sorted(((total + discount * step, first, state)
+                           for (total, first, state), step in zip(expansions, step_scores)),
+                          key=lambda entry: entry[0])[:self.beam_width]
+
+            reached = depth + 1
+            for total, first, _ in beam:
+                if best[first][0] < reached or total < best[first][1]:
+                    best[first] = (reached, total)
+
+        # Sequences that ended early pay trap_cost for every missing step
+        return {direction: total + (self.lookahead - depth) * self.values['trap_cost']
+                for direction, (depth, total) in best.items()}
+
+    def sequence_search(self, candidates, deadline):
+        """
+        Hill climbing with random restarts, or simulated annealing, over whole
+        move sequences. Each iteration changes one move of the current sequence.
+        Returns {first direction: best score}.
+        """
+        first_moves = [direction for direction, _ in candidates]
+        best = {}
+
+        def remember(moves, score):
+            if score < best.get(moves[0], float('inf')):
+                best[moves[0]] = score
+
+        # Start from the best greedy rollout over all first moves
+        current, current_score = None, float('inf')
+        for first in first_moves:
+            moves = self.random_sequence(first, greedy=True)
+            score = self.evaluate_sequence(moves)
+            remember(moves, score)
+            if score < current_score:
+                current, current_score = moves, score
+        stale = 0
+
+        for iteration in range(self.max_iterations):
+            if time.perf_counter() > deadline:
+                break
+
+            candidate = self.neighbour_sequence(current, first_moves)
+            candidate_score = self.evaluate_sequence(candidate)
+            remember(candidate, candidate_score)
+            delta = candidate_score - current_score
+
+            if self.strategy == 'annealing':
+                # Geometric cooling over the iteration budget
+                temperature = self.start_temperature * (0.01 ** (iteration / self.max_iterations))
+                if delta < 0 or random.random() < np.exp(-delta / temperature):
+                    current, current_score = candidate, candidate_score
+            elif delta < 0:
+                current, current_score = candidate, candidate_score
+                stale = 0
+            else:
+                # Restart from a new random sequence once no neighbour improves
+                stale += 1
+                if stale >= self.lookahead * 3:
+                    current = self.random_sequence(random.choice(first_moves))
+                    current_score = self.evaluate_sequence(current)
+                    remember(current, current_score)
+                    stale = 0
+
+        return best
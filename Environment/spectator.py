@@ -0,0 +1,236 @@
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import threading
+from environment_constants import *
+from diffs import TickDiff, Snapshot
+
+RESYNC = object()   # Queue marker: send a full snapshot before the next diff
+
+
+def encode(message):
+    return json.dumps(message, separators=(',', ':')).encode() + b'\n'
+
+
+class Subscriber:
+    def __init__(self, writer, queue_size):
+        self.writer = writer
+        self.queue = asyncio.Queue(queue_size)
+        self.skipped = 0    # Diffs dropped because the subscriber fell behind
+        self.task = asyncio.current_task()
+
+
+class SpectatorServer:
+    """
+    Streams a running game to any number of TCP subscribers as JSON lines:
+    a snapshot on connect, then the engine's diff of every tick
+    (Game.last_diff).
+    The asyncio loop runs in its own thread. publish() is called from the
+    simulation and only hands the diff to the loop, which encodes it, so the
+    simulation never waits for a socket. Every subscriber has a bounded
+    queue; one that falls behind has its queued diffs dropped and gets a
+    fresh snapshot instead (frame skipping), so a slow client never holds
+    back the others.
+    """
+
+    def __init__(self, host='127.0.0.1', port=SPECTATOR_PORT, queue_size=SPECTATOR_QUEUE_SIZE):
+        self.host = host
+        self.port = port
+        self.queue_size = queue_size
+        self.view = None
+        self.subscribers = set()
+        self.loop = None
+        self.server = None
+        self.thread = None
+
+    def start(self):
+        """Start the server thread and wait until it listens"""
+        ready = threading.Event()
+        self.thread = threading.Thread(target=self.run_loop, args=(ready,), daemon=True)
+        self.thread.start()
+        ready.wait()
+        return self
+
+    def run_loop(self, ready):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.server = self.loop.run_until_complete(
+            asyncio.start_server(self.handle_client, self.host, self.port))
+        self.port = self.server.sockets[0].getsockname()[1]
+        ready.set()
+        self.loop.run_forever()
+
+    def stop(self):
+        if self.loop is None:
+            return
+
+        async def shutdown():
+            self.server.close()
+            tasks = [subscriber.task for subscriber in self.subscribers]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await self.server.wait_closed()
+
+        asyncio.run_coroutine_threadsafe(shutdown(), self.loop).result(5)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(5)
+        self.loop = None
+
+    def publish(self, game, new_game=False):
+        """Send the last tick of game (call after every update, with
+        new_game=True for the first state of a game)"""
+        if new_game or game.last_diff is None:
+            self.loop.call_soon_threadsafe(self.broadcast, Snapshot.of(game))
+        else:
+            self.loop.call_soon_threadsafe(self.broadcast, game.last_diff)
+
+    def broadcast(self, change):
+        """Loop thread: update the board view with a Snapshot or TickDiff and
+        queue it for every subscriber"""
+        if isinstance(change, Snapshot):
+            # A new game: diffs still queued belong to the old one, drop them
+            # so none is sent after the new game's snapshot
+            self.view = change
+            for subscriber in self.subscribers:
+                self.resync(subscriber, skipped=False)
+            return
+
+        if self.view is None or not self.view.apply(change):
+            return
+        data = encode(change.to_dict())
+        for subscriber in self.subscribers:
+            try:
+                subscriber.queue.put_nowait(data)
+            except asyncio.QueueFull:
+                # Frame skipping: drop the backlog, the snapshot covers it
+                self.resync(subscriber)
+
+    def resync(self, subscriber, skipped=True):
+        """Replace everything queued for subscriber with a snapshot of the view"""
+        while not subscriber.queue.empty():
+            subscriber.queue.get_nowait()
+            if skipped:
+                subscriber.skipped += 1
+        subscriber.queue.put_nowait(RESYNC)
+
+    async def handle_client(self, reader, writer):
+        subscriber = Subscriber(writer, self.queue_size)
+        # Keep little unsent data per client, so a slow one falls back to frame skipping soon
+        writer.transport.set_write_buffer_limits(SPECTATOR_WRITE_BUFFER)
+        self.subscribers.add(subscriber)
+        if self.view is not None:
+            subscriber.queue.put_nowait(RESYNC)
+        try:
+            while True:
+                data = await subscriber.queue.get()
+                if data is RESYNC:
+                    data = encode(self.view.to_dict())
+                writer.write(data)
+                await writer.drain()  # Backpressure: only this subscriber waits
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self.subscribers.discard(subscriber)
+            writer.close()
+
+
+async def watch(host='127.0.0.1', port=SPECTATOR_PORT, on_frame=None, frames=None):
+    """
+    Subscribe to a server and keep a diffs.Snapshot up to date.
+    on_frame(view) is called after every snapshot or applied diff. Stops after frames
+    frames, or when the server closes the connection; returns the view.
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    view = None
+    count = 0
+    try:
+        while frames is None or count < frames:
+            line = await reader.readline()
+            if not line:
+                break
+            message = json.loads(line)
+            if message['t'] == 'snapshot':
+                view = Snapshot.from_dict(message)
+            elif view is None or not view.apply(TickDiff.from_dict(message)):
+                continue
+            count += 1
+            if on_frame is not None:
+                on_frame(view)
+    finally:
+        writer.close()
+    return view
+
+
+def serve(agents, host='127.0.0.1', port=SPECTATOR_PORT, fps=5.0, games=None):
+    """Play headless games forever (or games games) and stream them"""
+    from game_logic import Game
+
+    server = SpectatorServer(host, port).start()
+    print(f"Streaming on {server.host}:{server.port}", file=sys.stderr)
+    played = 0
+    while games is None or played < games:
+        game = Game(headless=True, agents=agents)
+        server.publish(game, new_game=True)
+        while not game.game_over:
+            game.update()
+            server.publish(game)
+            if fps:
+                time.sleep(1.0 / fps)
+        played += 1
+    server.stop()
+
+
+def show(host, port, headless):
+    """Watch a server: print one line per frame, or draw it with pygame"""
+    if headless:
+        def on_frame(view):
+            print(f"turn {view.turn} scores {view.scores} lengths {[len(b) for b in view.bodies]}"
+                  + (f" winner {view.winner}" if view.game_over else ""))
+        asyncio.run(watch(host, port, on_frame))
+        return
+
+    import pygame
+    from game_logic import Game
+
+    pygame.init()
+    screens = {}
+
+    def on_frame(view):
+        pygame.event.pump()
+        game = screens.get(len(view.bodies))
+        if game is None:
+            game = screens[len(view.bodies)] = Game(agents=[None] * len(view.bodies))
+        game.load_state(view.replay_state())
+        game.render()
+
+    asyncio.run(watch(host, port, on_frame))
+    pygame.quit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream games to remote viewers")
+    parser.add_argument("command", choices=['serve', 'watch'])
+    parser.add_argument("--host", default='127.0.0.1')
+    parser.add_argument("--port", type=int, default=SPECTATOR_PORT)
+    parser.add_argument("--agents", nargs='+', default=[DEFAULT_AGENT1, DEFAULT_AGENT2],
+                        help="one agent per snake (serve)")
+    parser.add_argument("--fps", type=float, default=5.0, help="ticks per second, 0 for full speed (serve)")
+    parser.add_argument("--games", type=int, default=None, help="stop after this many games (serve)")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--headless", action='store_true', help="print frames instead of drawing (watch)")
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        if args.seed is not None:
+            random.seed(args.seed)
+        serve(args.agents, args.host, args.port, args.fps, args.games)
+    else:
+        show(args.host, args.port, args.headless)
+
+
+if __name__ == "__main__":
+    main()
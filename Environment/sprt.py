@@ -0,0 +1,208 @@
+import sys
+import json
+import math
+import argparse
+import multiprocessing
+from statistics import NormalDist
+from environment_constants import *
+from arena import play_matches, init_worker
+from agents import resolve_agent
+
+SEED_OFFSET = 200_000   # Evaluation games use their own seeds, apart from tuning.py
+Z_95 = 1.959964         # Two-sided 95% normal quantile
+MIN_VARIANCE = 0.05     # Floor of the per-game score variance (win/loss only is 0.25)
+
+
+def elo_to_score(elo):
+    """Expected score of a player elo points stronger than its opponent"""
+    return 1.0 / (1.0 + 10.0 ** (-elo / 400.0))
+
+
+def score_to_elo(score):
+    score = min(max(score, 1e-6), 1 - 1e-6)
+    return -400.0 * math.log10(1.0 / score - 1.0)
+
+
+class SPRT:
+    """
+    Sequential probability ratio test on win/draw/loss outcomes of a
+    candidate against a baseline.
+    H0: the candidate is elo0 Elo stronger, H1: it is elo1 Elo stronger.
+    The log likelihood ratio uses the normal approximation of the mean game
+    score (win 1, draw 0.5, loss 0), which holds with draws included; the
+    variance is floored at MIN_VARIANCE so a run of identical outcomes has
+    a finite ratio. The test accepts H1 when the ratio reaches log((1 - beta) / alpha) and H0
+    when it drops to log(beta / (1 - alpha)).
+    looks is the most times decision() will be asked; the 'elo' method
+    splits alpha over them (Bonferroni), so checking the interval after
+    every batch still errs with probability at most alpha.
+    """
+
+    def __init__(self, elo0=0.0, elo1=10.0, alpha=0.05, beta=0.05, looks=1):
+        self.elo0 = elo0
+        self.elo1 = elo1
+        self.lower = math.log(beta / (1 - alpha))
+        self.upper = math.log((1 - beta) / alpha)
+        self.z_stop = NormalDist().inv_cdf(1 - alpha / (2 * max(1, looks)))  # Two-sided, per look
+        self.wins = self.draws = self.losses = 0
+
+    @property
+    def games(self):
+        return self.wins + self.draws + self.losses
+
+    def add(self, score):
+        """Count one game scored 1, 0.5 or 0 from the candidate's side"""
+        if score == 1:
+            self.wins += 1
+        elif score == 0:
+            self.losses += 1
+        else:
+            self.draws += 1
+
+    def mean_and_variance(self):
+        """Mean game score and per-game variance of the outcomes so far"""
+        n = self.games
+        mean = (self.wins + 0.5 * self.draws) / n
+        variance = (self.wins * (1 - mean) ** 2 + self.draws * (0.5 - mean) ** 2
+                    + self.losses * mean ** 2) / n
+        return mean, variance
+
+    def llr(self):
+        """Log likelihood ratio of H1 against H0"""
+        if not self.games:
+            return 0.0
+        mean, variance = self.mean_and_variance()
+        # Floored, so one-sided results (all wins, all losses) still decide
+        variance = max(variance, MIN_VARIANCE)
+        s0 = elo_to_score(self.elo0)
+        s1 = elo_to_score(self.elo1)
+        return self.games * (s1 - s0) * (2 * mean - s0 - s1) / (2 * variance)
+
+    def elo_bounds(self, z=Z_95, min_variance=0.0):
+        """Elo estimate with its confidence interval (95% by default)"""
+        if not self.games:
+            return 0.0, -math.inf, math.inf
+        mean, variance = self.mean_and_variance()
+        margin = z * math.sqrt(max(variance, min_variance) / self.games)
+        return score_to_elo(mean), score_to_elo(mean - margin), score_to_elo(mean + margin)
+
+    def decision(self, method='sprt'):
+        """'H1' or 'H0' once the result is significant, None while undecided.
+        method 'elo' instead stops when the interval excludes 0 ('H1'
+        stronger, 'H0' weaker), at the per-look level of z_stop and with the
+        variance floored at MIN_VARIANCE, so a few one-sided games cannot
+        collapse the interval to a point."""
+        if method == 'elo':
+            if self.games < 2:
+                return None
+            _, low, high = self.elo_bounds(self.z_stop, MIN_VARIANCE)
+            if low > 0:
+                return 'H1'
+            if high < 0:
+                return 'H0'
+            return None
+        llr = self.llr()
+        if llr >= self.upper:
+            return 'H1'
+        if llr <= self.lower:
+            return 'H0'
+        return None
+
+    def report(self):
+        elo, low, high = self.elo_bounds()
+        return (f"{self.games} games W/D/L {self.wins}/{self.draws}/{self.losses}  "
+                f"Elo {elo:+.1f} [{low:+.1f}, {high:+.1f}]  "
+                f"LLR {self.llr():.2f} ({self.lower:.2f}, {self.upper:.2f})")
+
+
+def game_pair(seed, candidate, baseline, values=None, baseline_values=None):
+    """The same seed played with the candidate on both colours"""
+    return [
+        {'seed': seed, 'agent1': candidate, 'agent2': baseline, 'values1': values, 'values2': baseline_values},
+        {'seed': seed, 'agent1': baseline, 'agent2': candidate, 'values1': baseline_values, 'values2': values},
+    ]
+
+
+def compare(candidate, baseline, values=None, baseline_values=None, method='sprt', elo0=0.0, elo1=10.0,
+            alpha=0.05, beta=0.05, batch=16, max_games=2000, workers=None, seed=0, verbose=True):
+    """
+    Play candidate against baseline in parallel batches of colour-swapped
+    game pairs until the test decides or max_games is reached.
+    Returns (decision, test) with decision 'H1', 'H0' or None.
+    """
+    pairs = max(1, batch // 2)
+    test = SPRT(elo0, elo1, alpha, beta, looks=math.ceil(max_games / (2 * pairs)))
+    next_seed = SEED_OFFSET + seed * max_games
+    decision = None
+
+    with multiprocessing.Pool(workers, initializer=init_worker) as pool:
+        while decision is None and test.games < max_games:
+            jobs = []
+            for index in range(pairs):
+                jobs.extend(game_pair(next_seed + index, candidate, baseline, values, baseline_values))
+            next_seed += pairs
+
+            for index, result in enumerate(play_matches(jobs, pool=pool)):
+                side = 1 if index % 2 == 0 else 2   # Candidate colour in this game
+                if result['winner'] == 0:
+                    test.add(0.5)
+                else:
+                    test.add(1 if result['winner'] == side else 0)
+
+            decision = test.decision(method)
+            if verbose:
+                print(test.report(), file=sys.stderr)
+
+    return decision, test
+
+
+def load_values(path):
+    """Agent values from a JSON file: a plain dict, or a tuning.py checkpoint"""
+    if not path:
+        return None
+    with open(path) as f:
+        data = json.load(f)
+    return data.get('best', data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two agents with a sequential test")
+    parser.add_argument("candidate", help="agent under test")
+    parser.add_argument("baseline", help="agent to compare against")
+    parser.add_argument("--values", help="JSON values of the candidate (or a tuning.py checkpoint)")
+    parser.add_argument("--baseline-values", help="JSON values of the baseline")
+    parser.add_argument("--method", choices=['sprt', 'elo'], default='sprt',
+                        help="stop on the SPRT bounds or when the Elo interval (corrected for "
+                             "repeated looks) excludes 0")
+    parser.add_argument("--elo0", type=float, default=0.0, help="Elo difference under H0")
+    parser.add_argument("--elo1", type=float, default=10.0, help="Elo difference under H1")
+    parser.add_argument("--alpha", type=float, default=0.05)
+    parser.add_argument("--beta", type=float, default=0.05)
+    parser.add_argument("--batch", type=int, default=16, help="games per parallel batch")
+    parser.add_argument("--max-games", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=None, help="parallel game processes")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for name in (args.candidate, args.baseline):
+        try:
+            resolve_agent(name)
+        except ValueError as error:
+            parser.error(str(error))
+
+    decision, test = compare(args.candidate, args.baseline, load_values(args.values),
+                             load_values(args.baseline_values), args.method, args.elo0, args.elo1,
+                             args.alpha, args.beta, args.batch, args.max_games, args.workers, args.seed)
+    print(test.report())
+    if decision == 'H1':
+        print(f"{args.candidate} is stronger than {args.baseline}")
+    elif decision == 'H0' and args.method == 'elo':
+        print(f"{args.candidate} is weaker than {args.baseline}")
+    elif decision == 'H0':
+        print(f"{args.candidate} is not stronger than {args.baseline} by {args.elo1} Elo")
+    else:
+        print(f"No decision after {test.games} games")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+from functools import lru_cache
+from collections import namedtuple
+from environment_constants import *
+
+# The 8 rotations and reflections of the plane as integer matrices (a, b, c, d):
+# (x, y) -> (a * x + b * y, c * x + d * y). They are orthogonal, so the
+# inverse of a transform is its transpose. IDENTITY comes first, so it wins
+# ties and symmetric positions keep their own orientation.
+IDENTITY = (1, 0, 0, 1)
+TRANSFORMS = (
+    IDENTITY, (0, -1, 1, 0), (-1, 0, 0, -1), (0, 1, -1, 0),     # Rotations by 0, 90, 180, 270 degrees
+    (-1, 0, 0, 1), (1, 0, 0, -1), (0, 1, 1, 0), (0, -1, -1, 0),  # Mirrors: x, y, main and anti diagonal
+)
+
+# Board state that can be canonicalised. Items are sorted tuples of positions,
+# so equal states compare and hash equal and can key caches directly.
+BoardState = namedtuple('BoardState', ['bodies', 'directions', 'normal_food', 'super_food', 'traps'])
+
+
+def transforms_for(width, height):
+    """Transforms that map a width x height board onto itself (all 8 when square)"""
+    if width == height:
+        return TRANSFORMS
+    return tuple(t for t in TRANSFORMS if t[1] == 0)  # No quarter turns or diagonal mirrors
+
+
+def transform_direction(direction, transform):
+    """Direction (or any offset) as seen after the transform"""
+    a, b, c, d = transform
+    x, y = direction
+    return a * x + b * y, c * x + d * y
+
+
+def inverse_direction(direction, transform):
+    """Map a direction of the transformed board back to the original board"""
+    a, b, c, d = transform
+    x, y = direction
+    return a * x + c * y, b * x + d * y
+
+
+def inverse(transform):
+    a, b, c, d = transform
+    return a, c, b, d
+
+
+def transform_position(position, transform, width=GRID_WIDTH, height=GRID_HEIGHT):
+    """Board position after the transform, turning about the board centre.
+    Works on doubled coordinates so odd and even board sizes stay integer."""
+    x, y = transform_direction((2 * position[0] - width + 1, 2 * position[1] - height + 1), transform)
+    if transform[1] != 0:
+        width, height = height, width  # Quarter turns and diagonal mirrors swap the axes
+    return (x + width - 1) // 2, (y + height - 1) // 2
+
+
+def inverse_position(position, transform, width=GRID_WIDTH, height=GRID_HEIGHT):
+    """Map a position of the transformed board back to the original board"""
+    if transform[1] != 0:
+        width, height = height, width
+    return transform_position(position, inverse(transform), width, height)
+
+
+def transform_state(state, transform, width=GRID_WIDTH, height=GRID_HEIGHT):
+    """BoardState as seen after the transform"""
+    def positions(cells):
+        return tuple(sorted(transform_position(p, transform, width, height) for p in cells))
+
+    return BoardState(
+        tuple(tuple(transform_position(p, transform, width, height) for p in body) for body in state.bodies),
+        tuple(transform_direction(direction, transform) for direction in state.directions),
+        positions(state.normal_food),
+        positions(state.super_food),
+        positions(state.traps),
+    )
+
+
+def board_state(snakes, food_manager):
+    """BoardState of live game objects: Snake bodies and directions and FoodManager items"""
+    return BoardState(
+        tuple(tuple(snake.body) for snake in snakes),
+        tuple(snake.direction for snake in snakes),
+        tuple(sorted(item.position for item in food_manager.normal_food_items)),
+        tuple(sorted(item.position for item in food_manager.super_food_items)),
+        tuple(sorted(item.position for item in food_manager.spike_trap_items)),
+    )
+
+
+def canonical_state(state, width=GRID_WIDTH, height=GRID_HEIGHT):
+    """
+    (canonical state, transform) of a BoardState: the smallest of its
+    symmetric variants, so all mirrored or rotated copies of a position give
+    the same state. Moves chosen on the canonical state are mapped back with
+    inverse_direction(move, transform).
+    """
+    best_state = None
+    best_transform = None
+    for transform in transforms_for(width, height):
+        candidate = state if transform == IDENTITY else transform_state(state, transform, width, height)
+        if best_state is None or candidate < best_state:
+            best_state, best_transform = candidate, transform
+    return best_state, best_transform
+
+
+@lru_cache(maxsize=None)
+def offset_permutations(offsets):
+    """For every transform, the index of the original offset that lands on
+    each offset, for a tuple of offsets closed under the 8 transforms"""
+    index = {offset: i for i, offset in enumerate(offsets)}
+    return tuple(tuple(index[inverse_direction(offset, transform)] for offset in offsets)
+                 for transform in TRANSFORMS)
+
+
+def canonical_window(codes, offsets, vectors=()):
+    """
+    (canonical key, transform) of a local window around a head: codes[i] is
+    the content of the cell at offsets[i], and vectors are offsets such as
+    the current direction that turn with the window. The key is a tuple of
+    the permuted codes followed by the transformed vectors, smallest over
+    all 8 transforms.
+    """
+    best_key = None
+    best_transform = None
+    for transform, permutation in zip(TRANSFORMS, offset_permutations(offsets)):
+        key = tuple(codes[i] for i in permutation)
+        for vector in vectors:
+            key += transform_direction(vector, transform)
+        if best_key is None or key < best_key:
+            best_key, best_transform = key, transform
+    return best_key, best_transform
@@ -0,0 +1,98 @@
+import os
+import glob
+import numpy as np
+from environment_constants import *
+
+# Column layout of every shard
+COLUMNS = (
+    ('game', np.uint32),
+    ('turn', np.uint16),
+    ('snake', np.uint8),
+    ('event', np.uint8),
+    ('x', np.int16),
+    ('y', np.int16),
+    ('value', np.int64),
+)
+
+
+class TelemetryWriter:
+    """
+    Append-only telemetry writer. Events are kept in preallocated column
+    buffers and written as compressed .npz shards once a buffer fills up,
+    so memory stays bounded no matter how many turns are recorded.
+    """
+
+    def __init__(self, directory, shard_size=TELEMETRY_SHARD_SIZE):
+        self.directory = directory
+        self.shard_size = shard_size
+        os.makedirs(directory, exist_ok=True)
+
+        self.columns = {name: np.zeros(shard_size, dtype=dtype) for name, dtype in COLUMNS}
+        self.count = 0
+
+        # Continue numbering after any shards already in the directory
+        shards = list_shards(directory)
+        self.shard_index = len(shards)
+        self.game_id = -1
+        if shards:
+            with np.load(shards[-1]) as last:
+                if len(last['game']):
+                    self.game_id = int(last['game'].max())
+
+    def new_game(self):
+        """Start recording a new game"""
+        self.game_id += 1
+        return self.game_id
+
+    def record(self, turn, snake, event, position=(0, 0), value=0):
+        """Append a single event to the current shard"""
+        i = self.count
+        columns = self.columns
+        columns['game'][i] = self.game_id
+        columns['turn'][i] = turn
+        columns['snake'][i] = snake
+        columns['event'][i] = event
+        columns['x'][i] = position[0]
+        columns['y'][i] = position[1]
+        columns['value'][i] = value
+        self.count += 1
+
+        if self.count == self.shard_size:
+            self.flush()
+
+    def flush(self):
+        """Write the buffered events as a compressed shard"""
+        if self.count == 0:
+            return
+
+        path = os.path.join(self.directory, f"shard-{self.shard_index:06d}.npz")
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez_compressed(f, **{name: column[:self.count] for name, column in self.columns.items()})
+        os.replace(tmp_path, path)  # Readers never see half written shards
+
+        self.shard_index += 1
+        self.count = 0
+
+    def close(self):
+        """Flush any remaining events"""
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def list_shards(directory):
+    """Return the shard files of a telemetry directory in write order"""
+    return sorted(glob.glob(os.path.join(directory, "shard-*.npz")))
+
+
+def read_telemetry(directory, columns=None):
+    """Yield one dict of column arrays per shard, loading only the requested columns"""
+    names = columns or [name for name, _ in COLUMNS]
+    for path in list_shards(directory):
+        with np.load(path) as shard:
+            yield {name: shard[name] for name in names}
@@ -0,0 +1,51 @@
+import random
+from game_logic import Game
+from diffs import Snapshot
+from replay import ReplayWriter, ReplayArchive
+
+
+def play(game, turns):
+    for _ in range(turns):
+        if game.game_over:
+            break
+        game.update()
+    return game
+
+
+def test_load_state_of_a_running_replay_turn(tmp_path):
+    path = str(tmp_path / 'games.rpl')
+    random.seed(0)
+    with ReplayWriter(path) as writer:
+        play(Game(replay=writer, headless=True, agents=['lut', 'lut']), 5)
+
+    viewer = Game(headless=True, agents=[None, None])
+    with ReplayArchive(path) as archive:
+        state = archive.load_turn(0, 3)
+        assert state.winner is None
+        viewer.load_state(state)
+    assert viewer.turn_count == state.turn
+    assert not viewer.game_over and viewer.winner is None
+    assert viewer.snake1.body == state.bodies[0]
+
+
+def test_load_state_of_a_running_snapshot():
+    random.seed(1)
+    game = play(Game(headless=True, agents=['lut', 'lut']), 5)
+    assert not game.game_over
+
+    viewer = Game(headless=True, agents=[None, None])
+    viewer.load_state(Snapshot.of(game).replay_state())
+    assert viewer.turn_count == game.turn_count
+    assert not viewer.game_over and viewer.winner is None
+    assert [snake.body for snake in viewer.snakes] == [snake.body for snake in game.snakes]
+
+
+def test_load_state_of_a_finished_snapshot():
+    random.seed(2)
+    game = play(Game(headless=True, agents=['lut', 'lut']), 10_000)
+    assert game.game_over
+
+    viewer = Game(headless=True, agents=[None, None])
+    viewer.load_state(Snapshot.of(game).replay_state())
+    assert viewer.game_over
+    assert viewer.snake_id(viewer.winner) == game.snake_id(game.winner)
@@ -0,0 +1,49 @@
+import json
+from ladder import Ladder, rating_name
+
+
+def result(seed, winner, agents=('astar', 'local'), values=None):
+    record = {'seed': seed, 'agents': list(agents), 'winner': winner, 'turns': 100, 'scores': [5, 3],
+              'decision_ms': [0.1, 0.1], 'job': f'job-{seed}'}
+    if values:
+        record['values'] = values
+    return record
+
+
+def write(path, records, partial=''):
+    with open(path, 'a') as f:
+        for record in records:
+            f.write(json.dumps(record) + '\n')
+        f.write(partial)
+
+
+def test_ingest_counts_each_result_once(tmp_path):
+    results = tmp_path / 'results.jsonl'
+    ladder = Ladder(str(tmp_path / 'ladder.json'))
+    write(results, [result(0, 1), result(1, 2)], partial='{"seed": 2, "agen')
+    assert ladder.ingest(str(results)) == 2
+    assert ladder.ingest(str(results)) == 0
+
+    # The coordinator restarted after dying mid-write: the cut-off line is skipped
+    write(results, [result(2, 1)])
+    ladder = Ladder(str(tmp_path / 'ladder.json'))
+    assert ladder.ingest(str(results)) == 0
+    write(results, [result(3, 1)])
+    assert ladder.ingest(str(results)) == 1
+    assert ladder.ratings['astar']['games'] == 3
+
+    saved = json.loads((tmp_path / 'ladder.json').read_text())
+    assert list(saved['ingested'].values()) == [results.stat().st_size]
+
+
+def test_overridden_values_are_rated_apart(tmp_path):
+    tuned = {'food_reward': 3}
+    ladder = Ladder()
+    ladder.record(result(0, 1, values=[tuned, {}]))
+    ladder.record(result(1, 1))
+    variant = rating_name('astar', tuned)
+    assert variant != 'astar'
+    assert ladder.ratings[variant]['games'] == 1
+    assert ladder.ratings['astar']['games'] == 1
+    assert ladder.job_args(variant, 2) == {'agent2': 'astar', 'values2': tuned}
+    assert ladder.job_args('local', 1) == {'agent1': 'local'}
@@ -0,0 +1,41 @@
+import random
+import game_logic
+import lut_agent
+from game_logic import Game
+from lut_agent import WindowEncoder
+from snake import Rivals
+
+
+def test_incremental_keys_match_a_fresh_encoding():
+    for seed, agents in ((0, ['astar', 'local']), (1, ['local', 'astar', 'local', 'astar'])):
+        random.seed(seed)
+        game = Game(headless=True, agents=agents)
+        encoder = WindowEncoder(game.grid, game.food_manager)
+        while not game.game_over:
+            for index, snake in enumerate(game.snakes):
+                if not snake.alive:
+                    continue
+                opponent = game.snakes[1 - index] if len(game.snakes) == 2 else Rivals(snake, game.snakes)
+                fresh = WindowEncoder(game.grid, game.food_manager)
+                assert encoder.encode(snake, opponent) == fresh.encode(snake, opponent)
+            game.update()
+
+
+def test_body_bits_rebuild_after_a_jump():
+    random.seed(2)
+    game = Game(headless=True, agents=['astar', 'astar'])
+    encoder = WindowEncoder(game.grid, game.food_manager)
+    for _ in range(5):
+        game.update()
+    encoder.encode(game.snake1, game.snake2)
+    game.snake2.body = [(3, 3), (3, 4), (3, 5)]  # Not a move, e.g. a loaded state
+    fresh = WindowEncoder(game.grid, game.food_manager)
+    assert encoder.encode(game.snake1, game.snake2) == fresh.encode(game.snake1, game.snake2)
+
+
+def test_distill_skips_the_max_turns_tick(monkeypatch):
+    monkeypatch.setattr(game_logic, 'MAX_TURNS', 10)
+    monkeypatch.setattr(lut_agent, 'MAX_TURNS', 10)
+    samples = lut_agent._distill_game((0, 'astar', 'astar'))
+    # Turns 1 to 9 have a move of each snake, turn 10 only ends the game
+    assert len(samples) == 2 * 9
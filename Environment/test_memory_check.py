@@ -0,0 +1,58 @@
+import os
+import pytest
+from environment_constants import *
+from game_logic import Game
+from memory_check import measure, over_budget
+from lut_agent import DEFAULT_TABLE
+
+# Without its table the lut agent only plays its greedy fallback, which says nothing about the agent
+needs_table = pytest.mark.skipif(not os.path.exists(DEFAULT_TABLE), reason="no lookup table built")
+
+
+@pytest.mark.parametrize('agents', [['astar', 'local'], ['astar', 'astar'], ['local', 'local'],
+                                    pytest.param(['lut', 'lut'], marks=needs_table)])
+def test_ticks_stay_within_budget(agents):
+    result = measure(agents, games=3, warmup_games=2)
+    assert result['ticks'] > 0
+    assert set(result['decision_peak_bytes']) == set(agents)
+    assert over_budget(result) == []
+
+
+def test_engine_allocations_are_caught(monkeypatch):
+    update = Game.update
+
+    def wasteful_update(self):
+        update(self)
+        throwaway = [object() for _ in range(100)]  # About 2.5 KB, objects have no free list
+        del throwaway
+
+    monkeypatch.setattr(Game, 'update', wasteful_update)
+    result = measure(['astar', 'astar'], games=1, warmup_games=1)
+    assert over_budget(result) == ['engine']
+
+
+def test_decision_allocations_are_caught(monkeypatch):
+    from snake_astar import SnakeAI
+    make_move = SnakeAI.make_move
+
+    def wasteful_make_move(self):
+        throwaway = [object() for _ in range(100)]  # About 2.5 KB, objects have no free list
+        make_move(self)
+        del throwaway
+
+    monkeypatch.setattr(SnakeAI, 'make_move', wasteful_make_move)
+    result = measure(['astar', 'local'], games=1, warmup_games=1)
+    assert over_budget(result) == ['astar']
+
+
+def test_leaks_are_caught(monkeypatch):
+    update = Game.update
+    leaked = []
+
+    def leaky_update(self):
+        update(self)
+        leaked.append({})
+
+    monkeypatch.setattr(Game, 'update', leaky_update)
+    result = measure(['astar', 'astar'], games=1, warmup_games=1)
+    assert 'kept blocks' in over_budget(result)
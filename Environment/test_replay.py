@@ -0,0 +1,35 @@
+import random
+from game_logic import Game
+from replay import ReplayWriter, ReplayArchive
+
+
+def record_games(writer, turns=(500, 500, 15)):
+    """Games recorded turn by turn, the last one cut off after its turns"""
+    for seed, limit in enumerate(turns):
+        random.seed(seed)
+        game = Game(headless=True, replay=writer, diffs=False)
+        while not game.game_over and game.turn_count < limit:
+            game.update()
+
+
+def games(archive):
+    return [[archive.load_turn(game, turn).bodies for turn in range(archive.game_length(game))]
+            for game in range(len(archive))]
+
+
+def test_unclosed_archive_is_readable(tmp_path):
+    closed_path, crashed_path = str(tmp_path / 'closed.replay'), str(tmp_path / 'crashed.replay')
+    with ReplayWriter(closed_path) as writer:
+        record_games(writer)
+
+    writer = ReplayWriter(crashed_path)
+    record_games(writer)
+    writer.file.write(b'\x01' * 10)  # The writer died inside a record
+    writer.file.flush()
+
+    with ReplayArchive(closed_path) as closed, ReplayArchive(crashed_path) as crashed:
+        assert len(crashed) == len(closed) == 3
+        assert [crashed.game_info(game) for game in range(3)] == [closed.game_info(game) for game in range(3)]
+        assert games(crashed) == games(closed)
+        assert crashed.load_turn(2, 15).game_over is False
+    writer.file.close()
@@ -0,0 +1,35 @@
+import pytest
+from environment_constants import *
+from cells import DIRECTIONS
+from rl_env import SnakeEnv, LOSS_REWARD
+
+LEFT_ACTION = DIRECTIONS.index(LEFT)
+
+
+def test_learner_does_not_move_on_the_horizon_tick():
+    env = SnakeEnv()
+    env.reset(seed=0)
+    env.game.turn_count = MAX_TURNS - 1
+    body = list(env.game.snake1.body)
+
+    _, _, terminated, truncated, _ = env.step(LEFT_ACTION)
+    assert env.game.snake1.body == body
+    assert truncated and not terminated
+    with pytest.raises(RuntimeError):
+        env.step(LEFT_ACTION)
+
+
+def test_collision_on_the_last_step_terminates():
+    env = SnakeEnv()
+    env.reset(seed=1)  # Nothing else ends this game before the wall
+    head_x = env.game.snake1.body[0][0]
+    # The learner runs into the left wall on exactly the last allowed step
+    env.max_turns = env.game.turn_count + head_x + 1
+    for _ in range(head_x):
+        _, _, terminated, truncated, _ = env.step(LEFT_ACTION)
+        assert not terminated and not truncated
+
+    _, reward, terminated, truncated, info = env.step(LEFT_ACTION)
+    assert terminated and not truncated
+    assert info['winner'] == 2
+    assert reward <= LOSS_REWARD * env.reward_scale
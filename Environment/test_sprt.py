@@ -0,0 +1,42 @@
+from sprt import SPRT
+
+
+def play(test, score, games, method='sprt'):
+    """Add games scored score until the test decides, returns the decision"""
+    for _ in range(games):
+        test.add(score)
+        decision = test.decision(method)
+        if decision is not None:
+            return decision
+    return None
+
+
+def test_clean_sweep_accepts_h1_early():
+    test = SPRT(0, 10)
+    assert play(test, 1, 500) == 'H1'
+    assert test.games < 100
+
+
+def test_only_losses_accept_h0_early():
+    test = SPRT(0, 10)
+    assert play(test, 0, 500) == 'H0'
+    assert test.games < 100
+
+
+def test_only_draws_accept_h0():
+    # Equal agents: the score sits on elo0, below the midpoint of the hypotheses
+    assert play(SPRT(0, 10), 0.5, 2000) == 'H0'
+
+
+def test_elo_method_decides_one_sided_results():
+    assert play(SPRT(looks=100), 1, 500, 'elo') == 'H1'
+    assert play(SPRT(looks=100), 0, 500, 'elo') == 'H0'
+
+
+def test_balanced_results_stay_undecided():
+    test = SPRT(0, 10)
+    for _ in range(10):
+        test.add(1)
+        test.add(0)
+    assert test.decision() is None
+    assert test.decision('elo') is None
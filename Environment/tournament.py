@@ -0,0 +1,356 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import threading
+import traceback
+import multiprocessing
+from multiprocessing.connection import Listener, Client
+from environment_constants import *
+from arena import play_match, init_worker
+from agents import agent_names, agent_pairings, resolve_agent
+
+DEFAULT_ADDRESS = ('127.0.0.1', 6381)
+AUTHKEY_ENV = 'TOURNAMENT_AUTHKEY'  # Environment variable read when --authkey is not given
+LEASE_SECONDS = 300     # A job not reported back within this time is handed out again
+MAX_ATTEMPTS = 3        # Jobs that fail this many times are given up
+RETRY_SECONDS = 1.0     # Pause of a worker between connection attempts and idle polls
+
+
+def job_id(spec):
+    """Stable id of a match spec, so the same match is never counted twice"""
+    text = json.dumps(spec, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(text.encode()).hexdigest()[:16]
+
+
+def round_robin(names=None, seeds=10, first_seed=0, self_play=False, values=None, max_turns=MAX_TURNS):
+    """
+    Match specs of a full round robin: every ordered pairing on every seed.
+    values maps an agent name to its value overrides (see tuning.py).
+    """
+    values = values or {}
+    specs = []
+    for agent1, agent2 in agent_pairings(names, self_play):
+        for seed in range(first_seed, first_seed + seeds):
+            spec = {'seed': seed, 'agent1': agent1, 'agent2': agent2, 'max_turns': max_turns}
+            if agent1 in values:
+                spec['values1'] = values[agent1]
+            if agent2 in values:
+                spec['values2'] = values[agent2]
+            specs.append(spec)
+    return specs
+
+
+def load_results(path):
+    """Results already in a JSON lines file, by job id. A partly written
+    last line (coordinator killed mid-write) is ignored."""
+    results = {}
+    if not path or not os.path.exists(path):
+        return results
+    with open(path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            results[record['job']] = record
+    return results
+
+
+class Coordinator:
+    """
+    Hands match specs to workers over a multiprocessing.connection socket
+    and collects their results.
+    A handed-out job is leased to its worker: it goes back to the queue when
+    the worker's connection drops or the lease runs out. Results are keyed by
+    job id and appended to a JSON lines file, so duplicates from retried jobs
+    are dropped and a restarted coordinator skips matches already played.
+    """
+
+    def __init__(self, specs, results_path=None, address=DEFAULT_ADDRESS, authkey=None,
+                 lease_seconds=LEASE_SECONDS, max_attempts=MAX_ATTEMPTS, verbose=True):
+        self.address = address
+        # Connections exchange pickles, so the key must stay secret: a fresh one unless given
+        self.authkey = authkey or os.urandom(32)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.verbose = verbose
+
+        self.results_path = results_path
+        self.results = load_results(results_path)
+        self.specs = {}
+        self.pending = []       # Job ids waiting for a worker, served first to last
+        for spec in specs:
+            key = job_id(spec)
+            if key not in self.specs and key not in self.results:
+                self.specs[key] = spec
+                self.pending.append(key)
+        self.pending.reverse()
+
+        self.leases = {}        # job id -> (connection id, deadline)
+        self.attempts = {}      # job id -> times handed out
+        self.failed = {}        # job id -> last error
+        self.lock = threading.Condition()
+        self.listener = None
+        self.results_file = None
+
+    def log(self, message):
+        if self.verbose:
+            print(message, file=sys.stderr)
+
+    @property
+    def finished(self):
+        return not self.pending and not self.leases
+
+    def run(self):
+        """Serve workers until every job has a result or has failed, then
+        return the results by job id"""
+        if self.results_path:
+            directory = os.path.dirname(self.results_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self.results_file = open(self.results_path, 'a')
+
+        self.listener = Listener(self.address, authkey=self.authkey)
+        self.address = self.listener.address
+        self.log(f"Coordinator on {self.address[0]}:{self.address[1]}, {len(self.pending)} jobs")
+        threading.Thread(target=self.accept_loop, daemon=True).start()
+
+        with self.lock:
+            while not self.finished:
+                self.lock.wait(1.0)
+                self.expire_leases()
+
+        self.listener.close()
+        if self.results_file is not None:
+            self.results_file.close()
+        if self.failed:
+            self.log(f"{len(self.failed)} jobs failed after {self.max_attempts} attempts")
+        return self.results
+
+    def accept_loop(self):
+        while True:
+            try:
+                conn = self.listener.accept()
+            except (multiprocessing.AuthenticationError, EOFError, ConnectionError) as error:
+                # Wrong key or a dropped handshake: refuse this client, keep serving the others
+                self.log(f"Rejected a connection: {error!r}")
+                continue
+            except OSError:
+                return  # Listener closed
+            threading.Thread(target=self.serve, args=(conn,), daemon=True).start()
+
+    def serve(self, conn):
+        """Talk to one worker. Message pairs are:
+        ('ready', name) -> ('job', id, spec) | ('wait', seconds) | ('done',)
+        ('result', id, result) and ('error', id, text) -> no reply"""
+        owner = id(conn)
+        name = '?'
+        try:
+            while True:
+                message = conn.recv()
+                kind = message[0]
+                if kind == 'ready':
+                    name = message[1]
+                    conn.send(self.next_job(owner))
+                elif kind == 'result':
+                    self.add_result(owner, message[1], message[2])
+                elif kind == 'error':
+                    self.add_error(owner, message[1], message[2])
+        except (EOFError, OSError):
+            pass
+        finally:
+            conn.close()
+            self.release(owner, name)
+
+    def next_job(self, owner):
+        with self.lock:
+            self.expire_leases()
+            if self.pending:
+                key = self.pending.pop()
+                self.leases[key] = (owner, time.monotonic() + self.lease_seconds)
+                self.attempts[key] = self.attempts.get(key, 0) + 1
+                return ('job', key, self.specs[key])
+            if self.leases:
+                return ('wait', RETRY_SECONDS)
+            return ('done',)
+
+    def add_result(self, owner, key, result):
+        with self.lock:
+            if key in self.results or key not in self.specs:
+                return  # Already reported by an earlier attempt
+            record = dict(result, job=key)
+            self.results[key] = record
+            self.leases.pop(key, None)
+            if key in self.pending:
+                self.pending.remove(key)
+            if self.results_file is not None:
+                self.results_file.write(json.dumps(record) + '\n')
+                self.results_file.flush()
+            self.log(f"[{len(self.results)}/{len(self.results) + len(self.pending) + len(self.leases)}] "
+                     f"{record['agents'][0]} vs {record['agents'][1]} seed {record['seed']}: "
+                     f"winner {record['winner']}")
+            self.lock.notify_all()
+
+    def add_error(self, owner, key, text):
+        with self.lock:
+            if self.leases.get(key, (None,))[0] == owner:
+                del self.leases[key]
+                self.requeue(key, text)
+            self.lock.notify_all()
+
+    def release(self, owner, name):
+        """Requeue the jobs of a worker whose connection closed"""
+        with self.lock:
+            lost = [key for key, (holder, _) in self.leases.items() if holder == owner]
+            for key in lost:
+                del self.leases[key]
+                self.requeue(key, f"worker {name} disconnected")
+            self.lock.notify_all()
+
+    def expire_leases(self):
+        """Requeue jobs whose worker stopped answering (caller holds the lock)"""
+        now = time.monotonic()
+        for key, (_, deadline) in list(self.leases.items()):
+            if deadline < now:
+                del self.leases[key]
+                self.requeue(key, "lease expired")
+
+    def requeue(self, key, reason):
+        if self.attempts.get(key, 0) >= self.max_attempts:
+            self.failed[key] = reason
+            self.log(f"Job {key} failed: {reason}")
+        else:
+            self.pending.append(key)
+            self.log(f"Job {key} requeued: {reason}")
+
+
+def run_worker(address=DEFAULT_ADDRESS, authkey=None, name=None, connect_timeout=60):
+    """
+    Pull jobs from a coordinator and play them until it reports done.
+    authkey is the coordinator's secret key.
+    Keeps retrying while the coordinator is not reachable yet, for up to
+    connect_timeout seconds. Returns the number of matches played.
+    """
+    if not authkey:
+        raise ValueError("A worker needs the coordinator's authkey")
+    name = name or f"{os.uname().nodename}:{os.getpid()}"
+    deadline = time.monotonic() + connect_timeout
+    while True:
+        try:
+            conn = Client(address, authkey=authkey)
+            break
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(RETRY_SECONDS)
+
+    init_worker()
+    played = 0
+    with conn:
+        while True:
+            conn.send(('ready', name))
+            try:
+                message = conn.recv()
+            except EOFError:
+                break  # Coordinator finished and closed the listener
+            if message[0] == 'done':
+                break
+            if message[0] == 'wait':
+                time.sleep(message[1])
+                continue
+
+            _, key, spec = message
+            try:
+                result = play_match(**spec)
+            except Exception:
+                conn.send(('error', key, traceback.format_exc(limit=3)))
+                continue
+            conn.send(('result', key, result))
+            played += 1
+    return played
+
+
+def start_workers(count, address=DEFAULT_ADDRESS, authkey=None):
+    """Start worker processes on this machine, each standing in for a node"""
+    if not authkey:
+        raise ValueError("Workers need the coordinator's authkey")
+    processes = []
+    for index in range(count):
+        process = multiprocessing.Process(target=run_worker, args=(address, authkey, f"local-{index}"),
+                                          daemon=True)
+        process.start()
+        processes.append(process)
+    return processes
+
+
+def summarize(results):
+    """Wins, draws and losses of every agent over a set of results"""
+    table = {}
+    for record in results.values():
+        for side, agent in enumerate(record['agents'], start=1):
+            row = table.setdefault(agent, {'wins': 0, 'draws': 0, 'losses': 0})
+            if record['winner'] == side:
+                row['wins'] += 1
+            elif record['winner'] == 0:
+                row['draws'] += 1
+            else:
+                row['losses'] += 1
+    return table
+
+
+def parse_address(text):
+    host, _, port = text.rpartition(':')
+    return (host or DEFAULT_ADDRESS[0], int(port))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Distributed round-robin tournament")
+    parser.add_argument("mode", choices=['coordinator', 'worker', 'local'],
+                        help="serve jobs, play jobs, or both on this machine")
+    parser.add_argument("--address", type=parse_address, default=DEFAULT_ADDRESS, help="host:port of the coordinator")
+    parser.add_argument("--authkey", default=os.environ.get(AUTHKEY_ENV),
+                        help=f"shared secret of coordinator and workers (default ${AUTHKEY_ENV}, required "
+                             f"unless mode is local)")
+    parser.add_argument("--agents", nargs='+', default=None, help=f"agents to play, default all of {', '.join(agent_names())}")
+    parser.add_argument("--seeds", type=int, default=10, help="games per ordered pairing")
+    parser.add_argument("--first-seed", type=int, default=0)
+    parser.add_argument("--self-play", action='store_true', help="also pair every agent with itself")
+    parser.add_argument("--results", help="JSON lines file that collects results, reused on restart")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes started by this node")
+    parser.add_argument("--lease", type=float, default=LEASE_SECONDS, help="seconds before an unanswered job is retried")
+    args = parser.parse_args()
+    # No default key: anyone who knows it can run code on the coordinator and the workers
+    if args.authkey:
+        authkey = args.authkey.encode()
+    elif args.mode == 'local':
+        authkey = os.urandom(32)
+    else:
+        parser.error(f"{args.mode} mode needs a shared secret, pass --authkey or set ${AUTHKEY_ENV}")
+
+    if args.mode == 'worker':
+        for process in start_workers(args.workers, args.address, authkey):
+            process.join()
+        return
+
+    for name in args.agents or ():
+        try:
+            resolve_agent(name)
+        except ValueError as error:
+            parser.error(str(error))
+
+    specs = round_robin(args.agents, args.seeds, args.first_seed, args.self_play)
+    coordinator = Coordinator(specs, args.results, args.address, authkey, args.lease)
+    if args.mode == 'local':
+        start_workers(args.workers, args.address, authkey)
+    results = coordinator.run()
+
+    print(f"{'agent':<14}{'wins':>6}{'draws':>7}{'losses':>8}")
+    for agent, row in sorted(summarize(results).items()):
+        print(f"{agent:<14}{row['wins']:>6}{row['draws']:>7}{row['losses']:>8}")
+
+
+if __name__ == "__main__":
+    main()
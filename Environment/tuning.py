@@ -0,0 +1,212 @@
+import os
+import sys
+import json
+import math
+import random
+import argparse
+from environment_constants import *
+from arena import play_matches
+from agents import agent_names, resolve_agent
+
+# Search space of every agent value: name -> (low, high), sampled as integers
+PARAMETERS = {
+    'normal_food_reward': (50, 200),
+    'super_food_reward': (70, 280),
+    'normal_food_cost': (5, 120),
+    'super_food_cost': (5, 80),
+    'normal_move_cost': (20, 160),
+    'trap_cost': (100, 600),
+    'distance_weight': (1, 15),
+    'opponent_penalty': (0, 40),
+    'trap_penalty': (0, 15),
+}
+
+# Values each agent class actually reads
+CLASS_PARAMETERS = {
+    'SnakeAI': list(PARAMETERS),
+    'SnakeLocalSearch': ['normal_food_cost', 'trap_cost', 'distance_weight'],
+}
+
+DEFAULT_VALUES = {
+    'normal_food_reward': NORMAL_FOOD_REWARD,
+    'super_food_reward': SUPER_FOOD_REWARD,
+    'normal_food_cost': NORMAL_FOOD_COST,
+    'super_food_cost': SUPER_FOOD_COST,
+    'normal_move_cost': SAVE_MOVE_COST,
+    'trap_cost': SPIKE_TRAP_COST,
+    'distance_weight': DISTANCE_WEIGHT,
+    'opponent_penalty': OPPONENT_PROXIMITY_PENALTY,
+    'trap_penalty': TRAP_PROXIMITY_PENALTY,
+}
+
+SEED_OFFSET = 100_000  # Tuning games use their own seeds, shared by all configs
+CHECKPOINT_EVERY = 32  # Game results between checkpoint writes
+
+
+class Tuner:
+    """
+    Tunes the values of one agent for win rate against a fixed opponent.
+    Configurations are evaluated on the same seeds so they are compared on
+    identical games; every seed is played twice with the tuned agent on
+    either colour, as in sprt.py. A configuration whose mean decision time
+    goes over budget_ms counts as a loss. Results are written to the
+    checkpoint file every CHECKPOINT_EVERY games, so a long run can be
+    stopped and resumed.
+    """
+
+    def __init__(self, agent='astar', opponent='local', strategy='halving', configs=27, games=6, eta=3,
+                 budget_ms=5.0, workers=None, checkpoint=None, seed=0):
+        class_name = resolve_agent(agent)[1]
+        if class_name not in CLASS_PARAMETERS:
+            raise ValueError(f"Agent {agent!r} has no tunable values")
+        if strategy not in ('random', 'halving'):
+            raise ValueError(f"Unknown strategy {strategy!r}, expected 'random' or 'halving'")
+
+        self.agent = agent
+        self.opponent = opponent
+        self.parameters = CLASS_PARAMETERS[class_name]
+        self.strategy = strategy
+        self.games = games
+        self.eta = eta
+        self.budget_ms = budget_ms
+        self.workers = workers
+        self.checkpoint = checkpoint
+
+        # Configurations are sampled from a seeded generator, so a resumed run sees the same ones
+        rng = random.Random(seed)
+        defaults = {name: DEFAULT_VALUES[name] for name in self.parameters}
+        self.configs = [defaults] + [self.sample_config(rng) for _ in range(configs - 1)]
+
+        # config index -> {'games', 'wins', 'ties', 'decision_ms'}
+        self.results = {}
+        if checkpoint and os.path.exists(checkpoint):
+            self.load()
+
+    def sample_config(self, rng):
+        """Random configuration inside the search space"""
+        return {name: rng.randint(*PARAMETERS[name]) for name in self.parameters}
+
+    def load(self):
+        """Resume from the checkpoint file"""
+        with open(self.checkpoint) as f:
+            state = json.load(f)
+        if ((state['agent'], state['opponent']) != (self.agent, self.opponent) or state['configs'] != self.configs
+                or not state.get('alternate_colours')):
+            raise ValueError(f"{self.checkpoint} belongs to a different tuning run")
+        self.results = {int(index): record for index, record in state['results'].items()}
+
+    def save(self):
+        """Write the checkpoint file atomically"""
+        if not self.checkpoint:
+            return
+        best = self.best()
+        state = {
+            'agent': self.agent,
+            'opponent': self.opponent,
+            'strategy': self.strategy,
+            'alternate_colours': True,
+            'configs': self.configs,
+            'results': self.results,
+            'best': self.configs[best] if best is not None else None,
+        }
+        tmp_path = self.checkpoint + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f, indent=1)
+        os.replace(tmp_path, self.checkpoint)
+
+    def evaluate(self, indices, games):
+        """Make sure every listed config has played at least `games` games"""
+        jobs, owners = [], []
+        for index in indices:
+            played = self.results.get(index, {}).get('games', 0)
+            for game in range(played, games):
+                # Game 2k and 2k + 1 play seed k with the tuned agent blue, then orange
+                seed = SEED_OFFSET + game // 2
+                if game % 2 == 0:
+                    jobs.append({'seed': seed, 'agent1': self.agent, 'agent2': self.opponent,
+                                 'values1': self.configs[index]})
+                else:
+                    jobs.append({'seed': seed, 'agent1': self.opponent, 'agent2': self.agent,
+                                 'values2': self.configs[index]})
+                owners.append((index, game % 2 + 1))  # Config and the colour it plays
+
+        # Results arrive in job order, so every checkpoint holds the first games of each config
+        for done, ((index, side), result) in enumerate(zip(owners, play_matches(jobs, self.workers)), start=1):
+            record = self.results.setdefault(index, {'games': 0, 'wins': 0, 'ties': 0, 'decision_ms': 0.0})
+            record['games'] += 1
+            record['wins'] += result['winner'] == side
+            record['ties'] += result['winner'] == 0
+            record['decision_ms'] += result['decision_ms'][side - 1]
+            if done % CHECKPOINT_EVERY == 0:
+                self.save()
+        self.save()
+
+    def fitness(self, index):
+        """Win rate (ties count half), 0 if the config is over the decision time budget"""
+        record = self.results.get(index)
+        if not record or not record['games']:
+            return 0.0
+        if record['decision_ms'] / record['games'] > self.budget_ms:
+            return 0.0
+        return (record['wins'] + 0.5 * record['ties']) / record['games']
+
+    def best(self):
+        """Index of the best config among those that played the most games
+        (the last successive halving rung, or all configs for random search)"""
+        if not self.results:
+            return None
+        return max(self.results, key=lambda index: (self.results[index]['games'], self.fitness(index)))
+
+    def run(self):
+        """Run the search and return (best values, fitness)"""
+        survivors = list(range(len(self.configs)))
+
+        if self.strategy == 'random':
+            self.evaluate(survivors, self.games)
+        else:
+            # Successive halving: play more games with fewer configs each rung
+            games = self.games
+            while True:
+                self.evaluate(survivors, games)
+                self.report(survivors)
+                if len(survivors) <= 1:
+                    break
+                survivors.sort(key=self.fitness, reverse=True)
+                survivors = survivors[:max(1, math.ceil(len(survivors) / self.eta))]
+                games *= self.eta
+
+        best = self.best()
+        return self.configs[best], self.fitness(best)
+
+    def report(self, indices):
+        """Print the current standing of some configs"""
+        for index in sorted(indices, key=self.fitness, reverse=True)[:5]:
+            record = self.results[index]
+            print(f"config {index:3d}: win rate {self.fitness(index):.3f} over {record['games']} games, "
+                  f"{record['decision_ms'] / record['games']:.2f} ms/move", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tune agent values with headless games")
+    parser.add_argument("--agent", choices=agent_names(), default='astar', help="agent to tune")
+    parser.add_argument("--opponent", choices=agent_names(), default='local')
+    parser.add_argument("--strategy", choices=['random', 'halving'], default='halving')
+    parser.add_argument("--configs", type=int, default=27, help="number of configurations (the defaults included)")
+    parser.add_argument("--games", type=int, default=6, help="games per configuration (first rung for halving)")
+    parser.add_argument("--eta", type=int, default=3, help="successive halving reduction factor")
+    parser.add_argument("--budget-ms", type=float, default=5.0, help="maximum mean decision time per move")
+    parser.add_argument("--workers", type=int, default=None, help="parallel game processes")
+    parser.add_argument("--checkpoint", help="JSON file used to save and resume the run")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    tuner = Tuner(args.agent, args.opponent, args.strategy, args.configs, args.games, args.eta,
+                  args.budget_ms, args.workers, args.checkpoint, args.seed)
+    values, fitness = tuner.run()
+    print(f"Best win rate {fitness:.3f} with:")
+    for name, value in values.items():
+        print(f"  {name} = {value}")
+
+
+if __name__ == "__main__":
+    main()